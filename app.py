@@ -1,16 +1,29 @@
 import streamlit as st
-import qrcode
-from io import BytesIO
+import os
 import subprocess
 import platform
 import re
+import tempfile
 import time
-import socket
 import struct
-import urllib.request
-import urllib.error
+import json
+import urllib.parse
 from datetime import datetime
 
+from capabilities import SPEEDTEST_MODULE, capabilities
+from fingerprints import FingerprintIndex, favicon_hash
+from netprobe import DEFAULT_TARGETS, is_reachable, probe_latency, race_http, sweep
+from qr_tools import QRCache, export_pdf, export_zip, read_networks_csv
+from saved_networks import SavedNetworkIndex, linux_items, macos_items, windows_items
+from scan_records import TABLE_SORTS, ScanResult, apply_diff, diff_scans, is_empty, paginate, table_rows
+from scan_service import (AdaptiveSchedule, BackgroundScanner, DiskCache, Job, JobCancelled, JobRunner,
+                          NMEventMonitor, ProbeBoard, SingleFlight)
+from signal_history import SignalHistory
+from speed_history import RETENTION as SPEED_RETENTION, SpeedHistory
+from throughput import measure_download, measure_upload
+from tracing import TRACE_ENV, TRACER, install_from_env, traced
+from wifi_backends import select_backend
+
 # ─────────────────────────────────────────────────────────────
 # PAGE CONFIG
 # ─────────────────────────────────────────────────────────────
@@ -103,7 +116,7 @@ st.markdown("""
 # ─────────────────────────────────────────────────────────────
 for _k, _v in {
     'speed_test_running': False,
-    'speed_results': None,
+    'speed_shown': None,           # finish time of the speed test this page last drew
     'selected_network': None,
     'continuous_monitor': False,
     'last_scan': None,
@@ -111,129 +124,82 @@ for _k, _v in {
     'qr_open_ssid': None,
     'router_info': None,           # cached router-info dict
     'router_scan_done': False,
+    'bulk_export': None,           # temp file of the last bulk QR export, until it is downloaded
+    'scan_view': None,             # ScanResult as displayed to this session
+    'scan_changes': None,          # last non-empty diff_scans() result + 'time'
+    'scan_seen_version': None,     # scanner version already folded into scan_view
+    'debug_profiling': False,      # sidebar profiling panel
+    'rerun_spans': [],             # this session's last PROFILE_RERUNS root spans, newest last
 }.items():
     if _k not in st.session_state:
         st.session_state[_k] = _v
 
+# ─────────────────────────────────────────────────────────────
+# PROFILING – one root span per rerun, helpers nest under it
+# ─────────────────────────────────────────────────────────────
+PROFILE_RERUNS = 10
+
+install_from_env()              # subprocess / socket hooks patch the process: WIFI_MANAGER_TRACE=1 at startup
+if st.session_state.rerun_spans:
+    TRACER.abandon(st.session_state.rerun_spans[-1])      # st.rerun() / st.stop() skipped the footer
+_rerun_span = TRACER.begin("rerun")
+st.session_state.rerun_spans = st.session_state.rerun_spans[-(PROFILE_RERUNS - 1):] + [_rerun_span]
+
 # ─────────────────────────────────────────────────────────────
 # HELPERS – network basics
 # ─────────────────────────────────────────────────────────────
+PROBE_TARGETS = DEFAULT_TARGETS      # (host, port) pairs used for TCP-connect probes
+APP_DATA_DIR  = os.path.join(os.path.expanduser("~"), ".wifi_manager")   # caches / indexes / history
+
+
+@traced()
 def check_internet_connection():
     try:
-        args = (['ping', '-n', '1', '-w', '1000', '8.8.8.8']
-                if platform.system() == "Windows"
-                else ['ping', '-c', '1', '-W', '1', '8.8.8.8'])
-        return subprocess.run(args, capture_output=True, timeout=2).returncode == 0
+        return is_reachable(PROBE_TARGETS, timeout=1.5)
     except:
         return False
 
 
+@traced()
 def get_current_wifi():
-    system = platform.system()
     try:
-        if system == "Windows":
-            out = subprocess.check_output(['netsh', 'wlan', 'show', 'interfaces'], timeout=5).decode('utf-8', errors='ignore')
-            m = re.search(r'SSID\s*:\s*(.*)', out)
-            return m.group(1).strip() if m else None
-        elif system == "Linux":
-            out = subprocess.check_output(['nmcli', '-t', '-f', 'Active,SSID', 'dev', 'wifi'], timeout=5).decode('utf-8')
-            for line in out.split('\n'):
-                if line.lower().startswith('yes:'):
-                    return line.split(':', 1)[1]
-        elif system == "Darwin":
-            out = subprocess.check_output(
-                ['/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport', '-I'],
-                timeout=5).decode('utf-8')
-            m = re.search(r'\sSSID:\s*(.*)', out)
-            return m.group(1).strip() if m else None
+        return select_backend().current_ssid()
     except:
-        pass
-    return None
+        return None
+
+
+@traced()
+def get_link_level():
+    """Signal of the current link in dBm (Linux: /proc/net/wireless), or None."""
+    try:
+        return select_backend().link_level()
+    except:
+        return None
 
 
 def get_default_gateway():
     """Return the default-gateway IP string, or None."""
-    system = platform.system()
     try:
-        if system == "Windows":
-            out = subprocess.check_output(['ipconfig'], timeout=5).decode('utf-8', errors='ignore')
-            m = re.search(r'Default Gateway[^:]*:\s*([\d.]+)', out)
-            return m.group(1).strip() if m else None
-        elif system == "Linux":
-            out = subprocess.check_output(['ip', 'route'], timeout=5).decode('utf-8')
-            m = re.search(r'default via ([\d.]+)', out)
-            return m.group(1).strip() if m else None
-        elif system == "Darwin":
-            out = subprocess.check_output(['netstat', '-rn'], timeout=5).decode('utf-8')
-            for line in out.split('\n'):
-                if line.startswith('default'):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        return parts[1]
+        return select_backend().default_gateway()
     except:
-        pass
-    return None
+        return None
 
 
-def scan_wifi_networks():
-    system = platform.system()
+@traced()
+def scan_wifi_networks(strict=False, rescan=True):
+    """
+    Scan nearby networks → ScanResult (one record per BSSID, grouped by SSID).
+    With strict=True errors are raised instead of shown.  rescan=False just
+    reads the current AP list – on Linux straight from nl80211 when
+    available, else nmcli without radio toggle / rescan / sleep.
+    """
     networks = []
     try:
-        if system == "Windows":
-            subprocess.run(['netsh','wlan','set','autoconfig','enabled=yes','interface="Wi-Fi"'], capture_output=True, timeout=5)
-            output = subprocess.check_output(['netsh','wlan','show','networks','mode=bssid'], timeout=10).decode('utf-8', errors='ignore')
-            cur = {}
-            for line in output.split('\n'):
-                line = line.strip()
-                m = re.match(r'SSID \d+ : (.*)', line)
-                if m:
-                    if cur: networks.append(cur)
-                    cur = {'ssid': m.group(1).strip(), 'signal': 0, 'security': 'Unknown'}
-                if 'Authentication' in line:
-                    cur['security'] = line.split(':')[1].strip()
-                m2 = re.match(r'Signal\s*:\s*(\d+)%', line)
-                if m2: cur['signal'] = int(m2.group(1))
-                if 'Channel' in line:
-                    try: cur['channel'] = line.split(':')[1].strip()
-                    except: pass
-            if cur: networks.append(cur)
-
-        elif system == "Linux":
-            subprocess.run(['nmcli','radio','wifi','on'], capture_output=True, timeout=5)
-            subprocess.run(['nmcli','device','wifi','rescan'], capture_output=True, timeout=5)
-            time.sleep(2)
-            output = subprocess.check_output(['nmcli','-f','SSID,SIGNAL,SECURITY,CHAN','dev','wifi','list'], timeout=10).decode('utf-8')
-            for line in output.split('\n')[1:]:
-                if line.strip():
-                    p = line.split()
-                    if len(p) >= 2:
-                        networks.append({'ssid': p[0] if p[0]!='--' else 'Hidden',
-                                         'signal': int(p[1]) if p[1].isdigit() else 0,
-                                         'security': ' '.join(p[2:-1]) if len(p)>3 else 'Open',
-                                         'channel': p[-1] if len(p)>2 else 'N/A'})
-
-        elif system == "Darwin":
-            output = subprocess.check_output(
-                ['/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport','-s'],
-                timeout=10).decode('utf-8')
-            for line in output.split('\n')[1:]:
-                if line.strip():
-                    p = line.split()
-                    if len(p) >= 3:
-                        rssi   = int(p[2])
-                        signal = max(0, min(100, (rssi+90)*100//60))
-                        networks.append({'ssid': p[0], 'signal': signal,
-                                         'security': p[1], 'channel': p[3] if len(p)>3 else 'N/A'})
+        networks = select_backend().scan(rescan=rescan)
     except Exception as e:
+        if strict: raise
         st.error(f"Scan error: {e}")
-
-    unique = {}
-    for n in networks:
-        s = n.get('ssid','')
-        if s:
-            if s not in unique or n.get('signal',0) > unique[s].get('signal',0):
-                unique[s] = n
-    return sorted(unique.values(), key=lambda x: x.get('signal',0), reverse=True)
+    return ScanResult(networks)
 
 
 def connect_to_wifi(ssid, password=None):
@@ -259,7 +225,7 @@ def connect_to_wifi(ssid, password=None):
                            f'</WLANProfile>')
                 with open('_tmp_wifi.xml','w') as f: f.write(profile)
                 subprocess.run(['netsh','wlan','add','profile','filename=_tmp_wifi.xml'], check=True, capture_output=True, timeout=10)
-                import os; os.remove('_tmp_wifi.xml')
+                os.remove('_tmp_wifi.xml')
             return subprocess.run(['netsh','wlan','connect',f'name={ssid}'], capture_output=True, timeout=10).returncode == 0
 
         elif system == "Linux":
@@ -278,49 +244,38 @@ def connect_to_wifi(ssid, password=None):
 # ─────────────────────────────────────────────────────────────
 # HELPERS – saved passwords
 # ─────────────────────────────────────────────────────────────
-def find_saved_passwords():
-    system  = platform.system()
-    results = []
-    try:
-        if system == "Windows":
-            out = subprocess.check_output(['netsh','wlan','show','profiles'], timeout=10).decode('utf-8', errors='ignore')
-            profiles = re.findall(r':\s+(.+)', out)
-            for p in profiles:
-                p = p.strip()
-                if not p: continue
-                try:
-                    detail = subprocess.check_output(['netsh','wlan','show','profile',p,'key=clear'], timeout=5).decode('utf-8', errors='ignore')
-                    m = re.search(r'Key Material\s*:\s*(.+)', detail)
-                    results.append({'ssid': p, 'password': m.group(1).strip() if m else ''})
-                except:
-                    results.append({'ssid': p, 'password': ''})
+@st.cache_resource
+def get_saved_index():
+    """Parsed saved networks, kept for the process and re-parsed only when they change."""
+    return SavedNetworkIndex()
 
-        elif system == "Linux":
-            import os, glob
-            for fp in sorted(glob.glob('/etc/NetworkManager/system-connections/*')):
-                try:
-                    with open(fp) as f: content = f.read()
-                    sm = re.search(r'id=(.+)', content)
-                    pm = re.search(r'psk=(.+)', content)
-                    results.append({'ssid': sm.group(1).strip() if sm else os.path.basename(fp),
-                                    'password': pm.group(1).strip() if pm else ''})
-                except: pass
 
-        elif system == "Darwin":
-            try:
-                out = subprocess.check_output(['security','find-generic-password','-t','AirPort Network','-g'],
-                                              timeout=10, stderr=subprocess.STDOUT).decode('utf-8', errors='ignore')
-                for ssid in re.findall(r'"svce"<blob>="(.+?)"', out):
-                    try:
-                        pwd = subprocess.check_output(['security','find-generic-password','-t','AirPort Network','-s',ssid,'-w'],
-                                                      timeout=5, stderr=subprocess.STDOUT).decode('utf-8').strip()
-                        results.append({'ssid': ssid, 'password': pwd})
-                    except:
-                        results.append({'ssid': ssid, 'password': ''})
-            except: pass
+SAVED_FETCH_WORKERS  = 8      # parallel netsh / security lookups
+SAVED_FETCH_DEADLINE = 30     # seconds for all per-profile lookups together
+
+
+def iter_saved_passwords(stats=None):
+    """Yield saved networks as they are read – unchanged ones first, from the index."""
+    system = platform.system()
+    if system == "Windows":
+        items = windows_items()
+    elif system == "Linux":
+        items = linux_items()
+    elif system == "Darwin":
+        try: items = macos_items()
+        except: return                 # no AirPort items in the keychain
+    else:
+        return
+    yield from get_saved_index().refresh_iter(items, SAVED_FETCH_WORKERS, SAVED_FETCH_DEADLINE, stats)
+
+
+@traced()
+def find_saved_passwords():
+    try:
+        return list(iter_saved_passwords())
     except Exception as e:
         st.error(f"⚠️ Error reading saved passwords: {e}")
-    return results
+        return []
 
 # ─────────────────────────────────────────────────────────────
 # HELPERS – router admin detection
@@ -351,101 +306,167 @@ BRAND_DEFAULTS = {
 }
 
 
-def detect_brand_from_page(ip: str) -> str:
-    """Quick HTTP GET to the router; look for brand keywords in the HTML."""
-    brands = ["TP-Link","D-Link","Netgear","ASUS","Linksys","Huawei",
-              "Cisco","Belkin","Tenda","Xiaomi","ZTE","Arris",
-              "tplink","dlink","netgear","asus","linksys","huawei",
-              "cisco","belkin","tenda","xiaomi","zte","arris"]
-    brand_map = {
-        "tplink":"TP-Link","tp-link":"TP-Link","tp_link":"TP-Link",
-        "dlink":"D-Link","d-link":"D-Link",
-        "netgear":"Netgear","asus":"ASUS",
-        "linksys":"Linksys","huawei":"Huawei",
-        "cisco":"Cisco","belkin":"Belkin",
-        "tenda":"Tenda","xiaomi":"Xiaomi",
-        "zte":"ZTE","arris":"Arris",
-    }
-    for proto in ("http", "https"):
-        for port in (80, 8080, 443, 8443):
-            try:
-                url = f"{proto}://{ip}:{port}/"
-                req = urllib.request.Request(url, headers={"User-Agent":"Mozilla/5.0"})
-                ctx = None
-                if proto == "https":
-                    import ssl
-                    ctx = ssl.create_default_context()
-                    ctx.check_hostname = False
-                    ctx.verify_mode = ssl.CERT_NONE
-                resp = urllib.request.urlopen(req, timeout=3, context=ctx)
-                html = resp.read(8192).decode('utf-8', errors='ignore').lower()
-                for kw in brands:
-                    if kw.lower() in html:
-                        return brand_map.get(kw.lower(), kw.title())
-            except:
-                continue
-    return "Generic"
-
-
-def scan_router():
+# lower-case keyword → brand; matched in one pass with a single compiled pattern
+BRAND_ALIASES = {
+    "tp-link":"TP-Link","tplink":"TP-Link","tp_link":"TP-Link",
+    "d-link":"D-Link","dlink":"D-Link",
+    "netgear":"Netgear","asus":"ASUS",
+    "linksys":"Linksys","huawei":"Huawei",
+    "cisco":"Cisco","belkin":"Belkin",
+    "tenda":"Tenda","xiaomi":"Xiaomi",
+    "zte":"ZTE","arris":"Arris",
+}
+BRAND_RE = re.compile("|".join(re.escape(k) for k in sorted(BRAND_ALIASES, key=len, reverse=True)))
+
+
+def match_brand(html: str):
+    """Return the first brand keyword found in `html`, or None."""
+    m = BRAND_RE.search(html.lower())
+    return BRAND_ALIASES[m.group(0)] if m else None
+
+
+@st.cache_resource
+def get_fingerprints():
+    """Bundled fingerprint table merged with ~/.wifi_manager/fingerprints.json."""
+    return FingerprintIndex.default(os.path.join(APP_DATA_DIR, "fingerprints.json"))
+
+
+def identify_router(ip: str) -> dict:
+    """
+    Race HTTP(S) GETs to the router and identify it from the first useful
+    response: fingerprint index (Server / realm / title) first, keyword scan
+    of the page second, favicon hash last – fetched only if the index has any.
+    """
+    index = get_fingerprints()
+
+    def from_page(r):
+        hit = index.identify(r)
+        if hit: return hit
+        brand = match_brand(r['body'].decode('utf-8', errors='ignore'))
+        return {'brand': brand, 'model': None, 'via': 'keyword'} if brand else None
+
+    def from_favicon(r):
+        return index.lookup('favicon', favicon_hash(r['body'])) if r['status'] == 200 and r['body'] else None
+
+    hit = None
+    try:
+        hit = race_http(ip, from_page, timeout=3)
+        if not hit and index.has('favicon'):
+            hit = race_http(ip, from_favicon, timeout=3, path='/favicon.ico', max_body=65536)
+    except:
+        pass
+    return hit or {'brand': "Generic", 'model': None, 'via': None}
+
+
+def get_gateway_mac(ip: str):
+    """Look the gateway up in the ARP table; returns 'aa:bb:…' or None."""
+    try:
+        if platform.system() == "Linux":
+            with open('/proc/net/arp') as f:
+                for line in f.read().split('\n')[1:]:
+                    p = line.split()
+                    if len(p) >= 4 and p[0] == ip and p[3] != '00:00:00:00:00:00':
+                        return p[3].lower()
+            return None
+        if not capabilities().binary('arp'):
+            return None
+        out = subprocess.check_output(['arp', '-a', ip] if platform.system() == "Windows" else ['arp', '-n', ip],
+                                      timeout=3).decode('utf-8', errors='ignore')
+        m = re.search(r'([0-9a-fA-F]{1,2}[:-]){5}[0-9a-fA-F]{1,2}', out)
+        return m.group(0).replace('-', ':').lower() if m else None
+    except:
+        return None
+
+
+@st.cache_resource
+def get_router_cache():
+    """Detected brands, persisted on disk and keyed by gateway IP + MAC."""
+    return DiskCache(os.path.join(APP_DATA_DIR, "router_cache.json"))
+
+
+@traced()
+def scan_router(use_cache=True):
     """Detect gateway + brand, return info dict."""
     gw = get_default_gateway()
     if not gw:
-        # brute-force common IPs
-        for ip in COMMON_GATEWAY_IPS:
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(1)
-                if s.connect_ex((ip, 80)) == 0 or s.connect_ex((ip, 8080)) == 0:
-                    gw = ip
-                    s.close()
-                    break
-                s.close()
-            except:
-                pass
+        # sweep common IPs in parallel – bounded by one connect timeout
+        try:
+            hits = sweep(COMMON_GATEWAY_IPS, ports=(80, 8080), timeout=1.0, first=True)
+            gw   = hits[0]['ip'] if hits else None
+        except:
+            pass
     if not gw:
         return None
 
-    brand = detect_brand_from_page(gw)
+    mac    = get_gateway_mac(gw)
+    key    = f"{gw}|{mac or '?'}"
+    cache  = get_router_cache()
+    ident  = cache.get(key) if use_cache else None
+    cached = ident is not None
+    if not cached:
+        ident = identify_router(gw)
+        cache.set(key, {'brand': ident['brand'], 'model': ident['model']})
+    brand = ident['brand']
     return {
         'ip': gw,
+        'mac': mac,
         'brand': brand,
+        'model': ident.get('model'),
+        'cached': cached,
         'defaults': BRAND_DEFAULTS.get(brand, BRAND_DEFAULTS["Generic"]),
     }
 
 # ─────────────────────────────────────────────────────────────
 # HELPERS – Okla speed test
 # ─────────────────────────────────────────────────────────────
-def _check_speedtest_cli():
-    """Return path to speedtest-cli binary if available, else None."""
-    for name in ('speedtest', 'speedtest-cli'):
-        try:
-            r = subprocess.run(['which' if platform.system() != 'Windows' else 'where', name],
-                               capture_output=True, text=True, timeout=5)
-            if r.returncode == 0:
-                return r.stdout.strip().split('\n')[0].strip()
-        except:
-            pass
-    return None
+NATIVE_ENGINE = {                    # built-in engine defaults – any HTTP server will do
+    'download_url': "http://speedtest.tele2.net/100MB.zip",
+    'upload_url':   "http://speedtest.tele2.net/upload.php",
+    'streams':      4,
+    'duration':     8.0,                 # seconds per direction, first 2 s trimmed as warm-up
+}
 
 
-def run_okla_speedtest():
+SPEED_HISTORY_RANGES = {"6 h": 6 * 3600, "24 h": 86400, "7 d": 7 * 86400, "30 d": 30 * 86400, "1 y": 365 * 86400}
+
+
+@traced()
+def run_okla_speedtest(job=None, engine=None, native_only=False):
     """
     Priority:
       1. Official Ookla speedtest-cli binary  (JSON output)
       2. pip speedtest-cli python package      (uses speedtest.net servers)
-      3. Manual download from tele2 fallback   (last resort)
-    Returns dict {download, upload, ping, server, isp, timestamp} or None
+      3. Built-in multi-stream engine          (last resort, or native_only=True)
+    Returns dict {download, upload, ping, server, isp, timestamp} or None.
+    `engine` overrides NATIVE_ENGINE settings for the built-in engine.
+
+    `job` is the JobRunner handle: phases (ping → download → upload) and
+    live throughput are reported through it, and job.check() between steps
+    raises JobCancelled once the user cancels.
     """
-    cli = _check_speedtest_cli()
+    job  = job or Job("speedtest")
+    caps = capabilities()
+    cli  = None if native_only else caps.speedtest_cli
 
     # ── 1) official binary ──
     if cli:
         try:
-            r = subprocess.run([cli, '--json'], capture_output=True, text=True, timeout=60)
-            if r.returncode == 0:
-                import json
-                data = json.loads(r.stdout)
+            job.update(phase="running Ookla CLI", progress=0.05, engine="cli")
+            proc = subprocess.Popen([cli, '--json'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            t0 = time.time()
+            try:
+                while proc.poll() is None:
+                    if job.cancelled or time.time() - t0 > 60:
+                        proc.kill()
+                        job.check()
+                        raise subprocess.TimeoutExpired(cli, 60)
+                    job.update(progress=min(0.95, (time.time() - t0) / 30))
+                    time.sleep(0.25)
+                out = proc.stdout.read()
+            finally:
+                if proc.poll() is None: proc.kill()
+            if proc.returncode == 0:
+                data = json.loads(out)
                 return {
                     'download': round(data.get('download',{}).get('bandwidth',0) * 8 / 1_000_000, 2),
                     'upload':   round(data.get('upload',{}).get('bandwidth',0) * 8 / 1_000_000, 2),
@@ -455,18 +476,26 @@ def run_okla_speedtest():
                     'timestamp': datetime.now().strftime('%H:%M:%S'),
                     'source': 'Ookla speedtest-cli (official)'
                 }
+        except JobCancelled:
+            raise
         except:
             pass
 
     # ── 2) python speedtest-cli package ──
     try:
-        import speedtest          # noqa – optional dependency
+        if native_only: raise ImportError
+        speedtest = caps.load(SPEEDTEST_MODULE)       # optional dependency, imported on first use
+        job.update(phase="ping", progress=0.05, engine="python")
         s = speedtest.Speedtest()
-        s.get_best()
+        best = s.get_best()
+        job.check()
+        job.update(phase="download", progress=0.2, ping=round(s.results.ping, 2))
         dl = round(s.download() / 1_000_000, 2)
+        job.check()
+        job.update(phase="upload", progress=0.6, download=dl)
         ul = round(s.upload()   / 1_000_000, 2)
+        job.update(upload=ul)
         ping = round(s.results.ping, 2)
-        best = s.get_best()
         return {
             'download': dl,
             'upload':   ul,
@@ -478,47 +507,95 @@ def run_okla_speedtest():
         }
     except ImportError:
         pass
+    except JobCancelled:
+        raise
     except Exception:
         pass
 
-    # ── 3) manual fallback ──
+    # ── 3) built-in multi-stream engine ──
+    return run_native_speedtest(job, engine)
+
+
+def run_native_speedtest(job=None, engine=None):
+    """
+    Built-in engine: TCP-connect ping, then `streams` parallel HTTP
+    downloads and uploads for `duration` seconds each (see throughput.py).
+    Returns the same dict as run_okla_speedtest(), or None when nothing
+    could be transferred.
+    """
+    job = job or Job("speedtest")
+    cfg = dict(NATIVE_ENGINE, **(engine or {}))
     try:
-        url  = "http://speedtest.tele2.net/10MB.zip"
-        t0   = time.time()
-        with urllib.request.urlopen(url, timeout=30) as resp:
-            data = resp.read(5 * 1024 * 1024)
-        elapsed = time.time() - t0
-        dl = round((len(data) / elapsed) / (1024*1024), 2) if elapsed else 0
-        # ping
-        args = (['ping','-n','4','8.8.8.8'] if platform.system()=="Windows"
-                else ['ping','-c','4','8.8.8.8'])
-        r = subprocess.run(args, capture_output=True, text=True, timeout=10)
-        ping = 0
-        m = re.search(r'Average = (\d+)ms', r.stdout) or re.search(r'avg.*?= .*?/([\d.]+)/', r.stdout)
-        if m: ping = float(m.group(1))
+        # ping – TCP-connect RTT, no subprocess
+        job.update(phase="ping", progress=0.05, engine="built-in")
+        lat = probe_latency(PROBE_TARGETS, samples=10, timeout=1.0)
+        job.check()
+        job.update(phase="download", progress=0.1, ping=lat['avg'])
+        dl = measure_download(cfg['download_url'], streams=cfg['streams'], duration=cfg['duration'],
+                              on_sample=lambda f, mbps: job.update(progress=0.1 + 0.45 * f, download=round(mbps, 2)),
+                              should_stop=lambda: job.cancelled)
+        job.check()
+        job.update(phase="upload", progress=0.55, download=dl['mbps'])
+        ul = measure_upload(cfg['upload_url'], streams=cfg['streams'], duration=cfg['duration'],
+                            on_sample=lambda f, mbps: job.update(progress=0.55 + 0.45 * f, upload=round(mbps, 2)),
+                            should_stop=lambda: job.cancelled)
+        job.check()
+        job.update(upload=ul['mbps'])
+        if not dl['bytes'] and not ul['bytes']:
+            return None
+        host = urllib.parse.urlsplit(cfg['download_url']).hostname
         return {
-            'download': dl,
-            'upload':   round(dl*0.4,2),
-            'ping':     ping,
-            'server':   'tele2 fallback',
+            'download': dl['mbps'],
+            'upload':   ul['mbps'],
+            'ping':     lat['avg'] or 0,
+            'jitter':   lat['jitter'],
+            'loss':     lat['loss'],
+            'server':   host,
             'isp':      '',
             'timestamp': datetime.now().strftime('%H:%M:%S'),
-            'source': 'Manual fallback (tele2)'
+            'source': f"Built-in engine ({cfg['streams']} streams × {cfg['duration']:g}s)"
         }
+    except JobCancelled:
+        raise
     except:
         return None
 
 # ─────────────────────────────────────────────────────────────
 # HELPERS – QR / meters
 # ─────────────────────────────────────────────────────────────
-def generate_wifi_qr(ssid, password, security="WPA"):
-    wifi_string = f"WIFI:T:{security};S:{ssid};P:{password};;"
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(wifi_string)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buf = BytesIO(); img.save(buf, format="PNG"); buf.seek(0)
-    return buf
+@st.cache_resource
+def get_qr_cache():
+    """Process-wide LRU of rendered QR PNGs."""
+    return QRCache(max_items=256, max_bytes=8 * 1024 * 1024)
+
+
+def new_export(ext):
+    """A fresh temp file (mode 600 – exports carry passwords) for a bulk export."""
+    fd, path = tempfile.mkstemp(prefix="wifi_qr_", suffix=f".{ext}")
+    os.close(fd)
+    return path
+
+
+def discard_export(path):
+    if path:
+        try: os.remove(path)
+        except OSError: pass
+
+
+def serve_export(path):
+    """Download callable: the export is read when the user clicks, then deleted."""
+    def serve():
+        with open(path, "rb") as f:
+            data = f.read()
+        discard_export(path)
+        return data
+    return serve
+
+
+@traced()
+def generate_wifi_qr(ssid, password, security="WPA", size=10):
+    """Return the QR code as PNG bytes – served from the LRU when seen before."""
+    return get_qr_cache().render(ssid, password, security, size)
 
 
 def create_analog_meter(value, max_value, label, unit):
@@ -541,6 +618,336 @@ def create_analog_meter(value, max_value, label, unit):
       <div class="speed-label">{label}</div>
     </div>"""
 
+# ─────────────────────────────────────────────────────────────
+# HELPERS – background services (shared by every session)
+# ─────────────────────────────────────────────────────────────
+SCAN_CACHE_TTL = 15      # seconds a scan result is considered fresh
+SCAN_IDLE_AFTER = 120    # the background scanner parks once nobody has looked for this long
+AUTO_REFRESH_SECS = 5    # how often an open scanner page checks for a newer scan
+EVENT_FALLBACK_INTERVAL = 300   # safety-net rescan period while NetworkManager pushes events
+ADAPTIVE_MIN_INTERVAL   = 10    # floor for adaptive rescans (NetworkManager rate-limits below ~10 s)
+DIFF_SIGNAL_DELTA = 10    # signal points a network must move before its row re-renders
+TABLE_PAGE_SIZES = [25, 50, 100]
+HISTORY_SAMPLES  = 50_000  # ring-buffer slots (~15 bytes each) – memory is fixed at startup
+HISTORY_WINDOW   = 1800    # seconds of history charted per network
+STATUS_PROBE_TTL = {     # seconds each top-bar probe is reused for
+    'current_wifi': 10,
+    'internet':     20,
+}
+
+
+@st.cache_resource
+def get_flights():
+    """Process-wide single-flight coordinator: N sessions → 1 probe in flight."""
+    return SingleFlight()
+
+
+@st.cache_resource
+def get_history():
+    """Fixed-size signal history fed by every scan the process makes."""
+    return SignalHistory(capacity=HISTORY_SAMPLES)
+
+
+@st.cache_resource
+def get_scanner():
+    """Process-wide background scanner; page renders only read its cache."""
+    flights = get_flights()
+    scanner = BackgroundScanner(lambda: flights.do("scan", scan_wifi_networks, strict=True),
+                                ttl=SCAN_CACHE_TTL, idle_after=SCAN_IDLE_AFTER)
+    scanner.add_listener(get_history().record)
+    return scanner.start()
+
+
+@st.cache_resource
+def get_schedule():
+    """Adaptive rescan interval shared by the process-wide scanner."""
+    return AdaptiveSchedule(min_interval=ADAPTIVE_MIN_INTERVAL)
+
+
+@st.cache_resource
+def get_nm_monitor():
+    """Push-based AP updates from NetworkManager → passive refresh of the scanner cache."""
+    scanner, flights = get_scanner(), get_flights()
+    caps = capabilities()
+    return NMEventMonitor(
+        lambda: scanner.scan_once(
+            lambda: flights.do("scan_passive", scan_wifi_networks, strict=True, rescan=False)),
+        # only a stream that reports APs may stretch polling to the safety-net interval
+        commands=[c for c in (NMEventMonitor.GDBUS, NMEventMonitor.NMCLI) if caps.binary(c[0])],
+        on_source=lambda ap_events: scanner.set_event_driven(ap_events, EVENT_FALLBACK_INTERVAL))
+
+
+def _set_scan_ttl():
+    """The cache TTL is process-wide: written only when a viewer moves the slider."""
+    get_scanner().set_ttl(st.session_state.scan_ttl)
+
+
+def _set_adaptive():
+    """Adaptive rescans are process-wide: written only when a viewer changes them."""
+    get_scanner().set_schedule(get_schedule() if st.session_state.scan_adaptive else None)
+
+
+def _set_min_interval():
+    get_schedule().set_min_interval(st.session_state.scan_min_interval)
+
+
+def _toggle_live_updates():
+    """Live updates are process-wide: only an explicit flip starts or stops the monitor."""
+    monitor = get_nm_monitor()
+    (monitor.start if st.session_state.scan_live else monitor.stop)()
+
+
+@st.fragment(run_every=AUTO_REFRESH_SECS)
+def _watch_scanner(version):
+    """
+    Cheap poll: rerun the page only when a new scan differs from what this
+    session shows by more than DIFF_SIGNAL_DELTA – sub-threshold jitter is
+    swallowed here and nothing re-renders.  A session still waiting for its
+    first scan reruns as soon as any scan lands.
+    """
+    scanner = get_scanner()
+    scanner.touch()               # an open page keeps the worker scanning even when nothing changes
+    if scanner.version in (version, st.session_state.scan_seen_version):
+        return
+    if st.session_state.scan_view is None:
+        st.rerun()
+    networks, _ = scanner.snapshot()
+    if is_empty(diff_scans(st.session_state.scan_view, networks, DIFF_SIGNAL_DELTA)):
+        st.session_state.scan_seen_version = scanner.version
+    else:
+        st.rerun()
+
+
+def _sync_scan_view(networks):
+    """Fold a new scan into this session's displayed result and remember what changed."""
+    view = st.session_state.scan_view
+    if networks is None:
+        return view
+    diff = diff_scans(view, networks, DIFF_SIGNAL_DELTA)
+    if view is None or not is_empty(diff):
+        st.session_state.scan_view = apply_diff(view, networks, diff)
+        if view is not None:
+            st.session_state.scan_changes = dict(diff, time=time.time())
+    return st.session_state.scan_view
+
+
+@st.cache_resource
+def get_jobs():
+    """Process-wide background jobs – one speed test per host, shared by every session."""
+    return JobRunner()
+
+
+@st.cache_resource
+def get_speed_history():
+    """Every speed-test result, persisted with hour/day rollups."""
+    return SpeedHistory(os.path.join(APP_DATA_DIR, "speed_history.db"))
+
+
+def _recorded_speedtest(job, history, **kwargs):
+    """run_okla_speedtest() as a job that also appends its result to `history`."""
+    res = run_okla_speedtest(job, **kwargs)
+    if res:
+        history.append(res)
+    return res
+
+
+@st.fragment(run_every=1)
+def _speedtest_live(auto_every, run_kwargs):
+    """Live progress of the running speed test; also starts auto-tests without blocking."""
+    jobs = get_jobs()
+    job  = jobs.latest("speedtest")
+    if job is not None and not job.done:
+        snap = job.snapshot()
+        live = snap['live']
+        st.progress(snap['progress'], text=f"⏳ {snap['phase'].capitalize()} … {snap['elapsed']:.0f}s")
+        l1, l2, l3 = st.columns(3)
+        l1.metric("Ping", f"{live['ping']} ms" if live.get('ping') is not None else "—")
+        l2.metric("Download", f"{live['download']} Mbps" if live.get('download') is not None else "—")
+        l3.metric("Upload", f"{live['upload']} Mbps" if live.get('upload') is not None else "—")
+        if st.button("⏹️ Cancel", key="cancel_speedtest", disabled=job.cancelled):
+            job.cancel()
+        return
+    if job is not None and job.finished != st.session_state.speed_shown:
+        st.rerun()                    # a test finished since this page was drawn
+    if auto_every:
+        due = 0 if job is None else max(0, auto_every - (time.time() - job.finished))
+        st.info(f"📊 Auto-test every {auto_every}s · next in {due:.0f}s")
+        if not due:
+            jobs.submit("speedtest", _recorded_speedtest, get_speed_history(), **run_kwargs)
+            st.rerun()
+
+
+@st.cache_resource
+def get_status_probes():
+    """Top-bar probes, run concurrently and cached per probe."""
+    return (ProbeBoard(flights=get_flights())
+            .register('current_wifi', get_current_wifi,          STATUS_PROBE_TTL['current_wifi'])
+            .register('link_level',   get_link_level,            STATUS_PROBE_TTL['current_wifi'])
+            .register('internet',     check_internet_connection, STATUS_PROBE_TTL['internet']))
+
+
+def _history_rows(aps):
+    """Long-format {'time', 'signal', 'bssid'} for st.line_chart over the last HISTORY_WINDOW s."""
+    rows = {'time': [], 'signal': [], 'bssid': []}
+    for n in aps:
+        t, sig = get_history().window(n.bssid or n.ssid, HISTORY_WINDOW)
+        rows['time']   += [datetime.fromtimestamp(x) for x in t]
+        rows['signal'] += sig.tolist()
+        rows['bssid']  += [n.bssid or n.ssid] * len(t)
+    return rows
+
+
+def _connect_controls(ssid, security):
+    """Password form (or a plain button for open networks) that connects to `ssid`."""
+    if "Open" not in security:
+        with st.form(f"form_{ssid}"):
+            pwd = st.text_input("Password", type="password", key=f"pwd_{ssid}")
+            if st.form_submit_button("🔌 Connect", use_container_width=True):
+                with st.spinner(f"Connecting …"):
+                    if connect_to_wifi(ssid, pwd):
+                        st.success("✅ Connected!")
+                        get_status_probes().invalidate()
+                        time.sleep(2); st.rerun()
+                    else: st.error("❌ Failed")
+    else:
+        if st.button("🔌 Connect", key=f"conn_{ssid}", use_container_width=True):
+            with st.spinner("Connecting …"):
+                if connect_to_wifi(ssid):
+                    st.success("✅ Connected!")
+                    get_status_probes().invalidate()
+                    time.sleep(2); st.rerun()
+                else: st.error("❌ Failed")
+
+
+@st.fragment
+def _network_row(ssid, aps, hs=None):
+    """
+    One SSID row.  A fragment, so typing a password or pressing Connect
+    reruns this row only; the expander is keyed so a new label (signal
+    moved) keeps it open.  `hs` is the strongest AP's entry from
+    SignalHistory.summary(), computed once for every row.
+    """
+    net      = aps[0]
+    signal   = net.signal
+    security = net.security
+    icon     = "🟢" if signal>=70 else ("🟡" if signal>=40 else "🔴")
+    sc       = "signal-excellent" if signal>=70 else ("signal-good" if signal>=40 else "signal-fair")
+    sec_icon = "🔓" if "Open" in security else "🔒"
+    ap_note  = f" · {len(aps)} APs" if len(aps) > 1 else ""
+
+    with st.expander(f"{icon} {ssid} – {signal}% {sec_icon}{ap_note}", key=f"net_{ssid}"):
+        a, b = st.columns([2,1])
+        with a:
+            st.markdown(f"**SSID:** {ssid}  \n**Signal:** <span class='{sc}'>{signal}%</span>  \n"
+                        f"**Security:** {security}  \n**Channel:** {net.channel}"
+                        + (f"  \n**BSSID:** `{net.bssid}`" if net.bssid else ""),
+                        unsafe_allow_html=True)
+            st.progress(signal/100)
+            if hs and hs['n'] > 1:
+                st.caption(f"📈 Last {HISTORY_WINDOW//60} min: min {hs['min']}% · avg {hs['avg']}% · "
+                           f"max {hs['max']}% · trend {hs['trend']:+.1f}%/min")
+                st.line_chart(_history_rows(aps), x='time', y='signal',
+                              color='bssid' if len(aps) > 1 else None, height=160)
+            if len(aps) > 1:
+                st.dataframe([{'BSSID': n.bssid, 'Signal %': n.signal, 'Channel': n.channel,
+                               'MHz': n.freq or None, 'Mbit/s': n.rate or None} for n in aps],
+                             use_container_width=True, hide_index=True)
+        with b:
+            _connect_controls(ssid, security)
+
+@st.fragment
+def _network_table(view):
+    """
+    Paged, sortable, filterable grid – one row per SSID.  Only the current
+    page is sent to the browser, and the connect form is built for the
+    selected row alone, so render cost does not grow with the AP count.
+    """
+    f1, f2, f3, f4 = st.columns([3, 2, 2, 1])
+    query    = f1.text_input("Filter SSID", key="tbl_query", placeholder="🔎 Filter SSID …",
+                             label_visibility="collapsed")
+    security = f2.selectbox("Security", ["All", "Secured", "Open"], key="tbl_security",
+                            label_visibility="collapsed")
+    sort     = f3.selectbox("Sort by", list(TABLE_SORTS), key="tbl_sort", label_visibility="collapsed")
+    desc     = f4.toggle("↓", value=True, key="tbl_desc", help="Descending")
+
+    rows = table_rows(view, query, None if security == "All" else security.lower(), sort, desc)
+    p1, p2 = st.columns([1, 3])
+    size = p1.selectbox("Rows per page", TABLE_PAGE_SIZES, key="tbl_size")
+    pages = max(1, -(-len(rows) // size))
+    page  = p2.number_input(f"Page (of {pages})", 1, pages, min(st.session_state.get("tbl_page", 1), pages),
+                            key="tbl_page")
+    shown, page, pages = paginate(rows, page, size)
+    st.caption(f"{len(rows)} of {view.ssid_count} networks · page {page}/{pages}")
+
+    event = st.dataframe(shown, key="tbl_grid", on_select="rerun", selection_mode="single-row",
+                         use_container_width=True, hide_index=True,
+                         column_order=("ssid", "signal", "aps", "security", "channel", "band", "bssid"),
+                         column_config={
+                             'ssid':     st.column_config.TextColumn("SSID"),
+                             'signal':   st.column_config.ProgressColumn("Signal", format="%d%%",
+                                                                         min_value=0, max_value=100),
+                             'aps':      st.column_config.NumberColumn("APs"),
+                             'security': "Security", 'channel': "Channel", 'band': "Band",
+                             'bssid':    st.column_config.TextColumn("Strongest BSSID"),
+                         })
+    picked = event.selection.rows
+    if picked and picked[0] < len(shown):
+        row = shown[picked[0]]
+        st.markdown(f"**🔌 {row['ssid']}** – {row['signal']}% · {row['security']} · ch {row['channel']}")
+        _connect_controls(row['ssid'], row['security'])
+    else:
+        st.caption("Select a row to connect.")
+
+
+def _span_rows(root):
+    return [{'span': "\u2003" * depth + s.name,
+             'ms': round(s.seconds * 1000, 1),
+             'subprocs': len(s.procs),
+             'exit codes': ", ".join(str(p.get('code', p.get('error'))) for p in s.procs),
+             'round trips': len(s.net),
+             'error': s.error or ""} for depth, s in TRACER.tree(root)]
+
+
+def _profiling_panel():
+    """Sidebar debug panel: span tree of a recent rerun, background spans, trace export."""
+    st.markdown("### 🐞 Profiling")
+    if not TRACER.installed:
+        st.caption(f"Subprocess / socket hooks are off – spans show wall time only. "
+                   f"Start the app with `{TRACE_ENV}=1` to count commands and round trips.")
+    reruns = [r for r in st.session_state.rerun_spans if r.end is not None][::-1]
+    if reruns:
+        root = st.selectbox("Rerun", reruns, key="profile_rerun",
+                            format_func=lambda r: f"{datetime.fromtimestamp(r.wall_start):%H:%M:%S} "
+                                                  f"· {r.attrs.get('mode', '')} · {r.seconds * 1000:.0f} ms"
+                                                  + (f" ({r.error})" if r.error else ""))
+        rows = _span_rows(root)
+        st.caption(f"{sum(r['subprocs'] for r in rows)} subprocesses · "
+                   f"{sum(r['round trips'] for r in rows)} network round trips")
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        with st.expander("Commands & round trips"):
+            for _, s in TRACER.tree(root):
+                for p in s.procs:
+                    st.code(f"[{s.name}] $ {p['cmd']}  → {p.get('code', p.get('error'))}", language=None)
+                for kind, target, _t in s.net:
+                    st.caption(f"[{s.name}] {kind} {target}")
+    bg = TRACER.roots(exclude=("rerun",), limit=10)
+    if bg:
+        st.caption("Background (scanner, jobs)")
+        st.dataframe([r for s in bg for r in _span_rows(s)], hide_index=True, use_container_width=True)
+    st.download_button("⬇️ Chrome trace (JSON)", json.dumps(TRACER.chrome_trace()),
+                       f"wifi_trace_{datetime.now():%Y%m%d_%H%M%S}.json", "application/json",
+                       help="Open in chrome://tracing, ui.perfetto.dev or speedscope.app",
+                       use_container_width=True)
+    if st.button("🗑️ Clear spans", use_container_width=True):
+        TRACER.clear()
+
+
+def _age_label(age):
+    if age is None: return "never"
+    if age < 1:     return "just now"
+    if age < 60:    return f"{age:.0f}s ago"
+    return f"{age/60:.0f}m ago"
+
 # ═══════════════════════════════════════════════════════════════
 # MAIN APP
 # ═══════════════════════════════════════════════════════════════
@@ -548,19 +955,23 @@ st.markdown("<h1 style='text-align:center;color:white;'>📶 WiFi Manager Pro</h
 st.markdown("<p style='text-align:center;color:white;font-size:1.2em;'>Network Scanner • Ookla Speed • Router Admin • Password Finder • QR</p>", unsafe_allow_html=True)
 
 # ── top status bar ──
-current_wifi = get_current_wifi()
-has_internet = check_internet_connection()
+status = get_status_probes().read()
+current_wifi, wifi_age = status['current_wifi']
+link_level, _          = status['link_level']
+has_internet, net_age  = status['internet']
 c1, c2, c3   = st.columns(3)
 
 with c1:
     st.markdown(
         f"<div class='metric-card'><div class='status-{'connected' if current_wifi else 'disconnected'}'>"
         f"{'✅ Connected' if current_wifi else '❌ Disconnected'}</div>"
-        f"<p>{current_wifi or 'No WiFi'}</p></div>", unsafe_allow_html=True)
+        f"<p>{current_wifi or 'No WiFi'}{f' · 📶 {link_level:.0f} dBm' if current_wifi and link_level is not None else ''}</p>"
+        f"<small style='color:#94a3b8;'>checked {_age_label(wifi_age)}</small></div>", unsafe_allow_html=True)
 with c2:
     st.markdown(
         f"<div class='metric-card'><div class='status-{'connected' if has_internet else 'disconnected'}'>"
-        f"🌐 Internet</div><p>{'Online' if has_internet else 'Offline'}</p></div>", unsafe_allow_html=True)
+        f"🌐 Internet</div><p>{'Online' if has_internet else 'Offline'}</p>"
+        f"<small style='color:#94a3b8;'>checked {_age_label(net_age)}</small></div>", unsafe_allow_html=True)
 with c3:
     ls = st.session_state.last_scan
     st.markdown(
@@ -579,77 +990,138 @@ with st.sidebar:
         "🖥️ Router Admin",
         "📱 QR Generator",
     ], label_visibility="collapsed")
+    _rerun_span.attrs['mode'] = mode
     st.markdown("---")
 
     if mode == "📡 Network Scanner":
-        auto_scan = st.checkbox("🔄 Auto Refresh (5 s)")
+        auto_scan = st.checkbox(f"🔄 Auto Refresh ({AUTO_REFRESH_SECS} s)")
+        st.session_state.scan_ttl = int(get_scanner().ttl)                    # shared – show what is set
+        st.slider("Cache TTL (s)", 5, 120, key="scan_ttl", step=5, on_change=_set_scan_ttl)
+        st.session_state.scan_adaptive = get_scanner().schedule is not None    # shared – show what is on
+        if st.toggle("🧠 Adaptive rescans", key="scan_adaptive", on_change=_set_adaptive,
+                     help="Back off while the air is stable, rescan faster while signals fluctuate. Applies to every viewer."):
+            st.session_state.scan_min_interval = int(get_schedule().min_interval)
+            st.slider("Min rescan interval (s)", 5, 120, key="scan_min_interval", step=5, on_change=_set_min_interval)
+        if platform.system() == "Linux":
+            monitor = get_nm_monitor()
+            st.session_state.scan_live = monitor.running or monitor.gave_up    # shared – show what is on
+            st.toggle("⚡ Live updates (NetworkManager events)", key="scan_live", on_change=_toggle_live_updates,
+                      help="Refresh only when access points appear, vanish or change signal. Applies to every viewer.")
+            if monitor.gave_up:
+                st.caption(f"⚠️ No event source – polling instead ({monitor.last_error})")
+            elif monitor.running:
+                st.caption(f"📡 `{' '.join(monitor.command or ['…'])}` · "
+                           f"{monitor.relevant}/{monitor.events} events · {monitor.refreshes} refreshes"
+                           + ("" if monitor.ap_events else " · device events only, polling continues"))
         if st.button("🔍 Scan Now", use_container_width=True, type="primary"):
+            get_scanner().request_scan()
             st.session_state.last_scan = datetime.now().strftime('%H:%M:%S')
             st.rerun()
 
     elif mode == "⚡ Ookla Speed Test":
         monitor_interval = st.selectbox("Auto-test interval", ["Off","30s","60s","120s"])
+        with st.expander("⚙️ Built-in engine"):
+            native_only = st.toggle("Skip Ookla engines", help="Always measure with the built-in engine")
+            engine = {
+                'download_url': st.text_input("Download URL", NATIVE_ENGINE['download_url']),
+                'upload_url':   st.text_input("Upload URL", NATIVE_ENGINE['upload_url']),
+                'streams':      st.slider("Parallel streams", 1, 16, NATIVE_ENGINE['streams']),
+                'duration':     float(st.slider("Seconds per direction", 4, 30, int(NATIVE_ENGINE['duration']))),
+            }
+        speed_kwargs = {'engine': engine, 'native_only': native_only}
 
     elif mode == "🔑 Find Passwords":
         if st.button("🔍 Fetch Saved Passwords", use_container_width=True, type="primary"):
-            with st.spinner("Reading …"):
-                st.session_state.saved_passwords = find_saved_passwords()
-            st.rerun()
+            found, fetch = [], {}
+            with st.status("Reading …") as status:
+                try:
+                    with TRACER.span("find_saved_passwords", streamed=True):
+                        for entry in iter_saved_passwords(fetch):
+                            found.append(entry)
+                            status.update(label=f"Reading … {len(found)} found · 📶 {entry['ssid']}")
+                except Exception as e:
+                    st.error(f"⚠️ Error reading saved passwords: {e}")
+                status.update(label=f"✅ {len(found)} saved networks", state="complete")
+            st.session_state.saved_passwords = found
+            if fetch.get('timed_out'):
+                st.warning(f"⏱️ {fetch['timed_out']} profiles timed out – fetch again to retry.")
+            else:
+                st.rerun()
 
     elif mode == "🖥️ Router Admin":
+        redetect = st.checkbox("♻️ Ignore cached brand")
         if st.button("🔍 Detect Router", use_container_width=True, type="primary"):
             with st.spinner("Scanning …"):
-                st.session_state.router_info   = scan_router()
+                st.session_state.router_info   = scan_router(use_cache=not redetect)
                 st.session_state.router_scan_done = True
             st.rerun()
 
+    # ── shared probe counters ──
+    with st.expander("📊 Probe Coordination"):
+        counters = get_flights().counters()
+        if not counters:
+            st.caption("No probes yet.")
+        for key, c in sorted(counters.items()):
+            st.caption(f"**{key}** – {c['calls']} calls · {c['executions']} runs · {c['coalesced']} coalesced")
+
 # ═══════════════════════════════════════════════════════════════
 #  📡  NETWORK SCANNER
 # ═══════════════════════════════════════════════════════════════
 if mode == "📡 Network Scanner":
     st.markdown("### 🔍 Available WiFi Networks")
-    with st.spinner("Scanning …"):
-        networks = scan_wifi_networks()
-
-    if networks:
-        st.success(f"Found {len(networks)} networks")
-        for net in networks:
-            signal   = net.get('signal',0)
-            ssid     = net.get('ssid','Unknown')
-            security = net.get('security','Unknown')
-            icon     = "🟢" if signal>=70 else ("🟡" if signal>=40 else "🔴")
-            sc       = "signal-excellent" if signal>=70 else ("signal-good" if signal>=40 else "signal-fair")
-            sec_icon = "🔓" if "Open" in security else "🔒"
-
-            with st.expander(f"{icon} {ssid} – {signal}% {sec_icon}"):
-                a, b = st.columns([2,1])
-                with a:
-                    st.markdown(f"**SSID:** {ssid}  \n**Signal:** <span class='{sc}'>{signal}%</span>  \n"
-                                f"**Security:** {security}  \n**Channel:** {net.get('channel','N/A')}",
-                                unsafe_allow_html=True)
-                    st.progress(signal/100)
-                with b:
-                    if "Open" not in security:
-                        with st.form(f"form_{ssid}"):
-                            pwd = st.text_input("Password", type="password", key=f"pwd_{ssid}")
-                            if st.form_submit_button("🔌 Connect", use_container_width=True):
-                                with st.spinner(f"Connecting …"):
-                                    if connect_to_wifi(ssid, pwd):
-                                        st.success("✅ Connected!")
-                                        time.sleep(2); st.rerun()
-                                    else: st.error("❌ Failed")
-                    else:
-                        if st.button("🔌 Connect", key=f"conn_{ssid}", use_container_width=True):
-                            with st.spinner("Connecting …"):
-                                if connect_to_wifi(ssid):
-                                    st.success("✅ Connected!")
-                                    time.sleep(2); st.rerun()
-                                else: st.error("❌ Failed")
-    else:
+    scanner = get_scanner()
+    networks, scan_age = scanner.snapshot()
+
+    pending = networks is None and not scanner.last_error
+    if pending:
+        st.info("⏳ First scan running in the background – results appear here when it finishes.")
+    if scanner.last_error:
+        st.error(f"Scan error: {scanner.last_error}")
+    if scan_age is not None:
+        hist = get_history()
+        st.caption(f"🕒 Results {scan_age:.0f}s old · TTL {scanner.ttl:.0f}s · next rescan every {scanner.interval:.0f}s"
+                   f" · 📈 {len(hist):,}/{hist.capacity:,} samples ({hist.nbytes/1024:.0f} KB)"
+                   f"{' · 🔄 rescanning …' if scanner.scanning else ''}")
+    if scanner.schedule:
+        with st.expander("📈 Rescan Scheduler"):
+            sm = scanner.schedule.metrics()
+            k1, k2, k3, k4 = st.columns(4)
+            k1.metric("Interval", f"{sm['interval']} s")
+            k2.metric("Scans", sm['scans'])
+            k3.metric("Avg cost", f"{sm['avg_cost']} s" if sm['avg_cost'] is not None else "—")
+            k4.metric("Last change", f"{sm['last_change']*100:.0f}%" if sm['last_change'] is not None else "—")
+            if scanner.schedule.decisions:
+                st.dataframe([dict(d, time=datetime.fromtimestamp(d['time']).strftime('%H:%M:%S'))
+                              for d in reversed(scanner.schedule.decisions)],
+                             use_container_width=True, hide_index=True)
+
+    view = _sync_scan_view(networks)
+    changes = st.session_state.scan_changes
+    if changes:
+        st.info(f"🔄 Last change {_age_label(time.time() - changes['time'])}: "
+                f"🆕 {len(changes['added'])} new · ❌ {len(changes['removed'])} gone · "
+                f"📶 {len(changes['changed'])} changed · {changes['unchanged']} unchanged")
+        with st.expander("What changed"):
+            for label, names in (("🆕 New", changes['added']), ("❌ Gone", changes['removed']),
+                                 ("📶 Changed", changes['changed'])):
+                if names:
+                    st.markdown(f"**{label}:** " + ", ".join(names))
+
+    if view:
+        st.success(f"Found {view.ssid_count} networks · {len(view)} access points")
+        layout = st.radio("Layout", ["📋 Table", "🗂️ Cards"], horizontal=True, key="scan_layout",
+                          label_visibility="collapsed")
+        if layout == "📋 Table":
+            _network_table(view)
+        else:
+            summary = get_history().summary(HISTORY_WINDOW)      # one vectorised pass for every row
+            for ssid, aps in view.groups():
+                _network_row(ssid, aps, summary.get(aps[0].bssid or aps[0].ssid))
+    elif not pending:
         st.error("No networks found. Ensure WiFi is enabled.")
 
-    if auto_scan:
-        time.sleep(5); st.rerun()
+    if auto_scan or pending:
+        _watch_scanner(scanner.version)
 
 # ═══════════════════════════════════════════════════════════════
 #  ⚡  OOKLA SPEED TEST
@@ -660,29 +1132,53 @@ elif mode == "⚡ Ookla Speed Test":
     if not has_internet:
         st.error("❌ No internet. Connect first.")
     else:
-        # show which engine will be used
-        cli = _check_speedtest_cli()
-        if cli:
-            st.info(f"🏆 Using **Ookla speedtest-cli** binary: `{cli}`")
-        else:
-            try:
-                import speedtest  # noqa
-                st.info("📦 Using **speedtest-cli Python package** (Ookla servers)")
-            except ImportError:
-                st.warning("⚠️ No Ookla engine found — will use manual fallback.  "
+        # show which engine will be used – detected once per process, see capabilities.py
+        caps = capabilities()
+        t0   = time.perf_counter()
+        kind = caps.speedtest_engine(speed_kwargs['native_only'])
+        lookup_us = (time.perf_counter() - t0) * 1e6
+        if kind == "native":
+            msg = (f"🧪 Using the **built-in engine** – {engine['streams']} streams against "
+                   f"`{urllib.parse.urlsplit(engine['download_url']).netloc}`")
+            if speed_kwargs['native_only']:
+                st.info(msg)
+            else:
+                st.warning("⚠️ No Ookla engine found — will use the built-in engine.  "
                            "Install the official CLI: `sudo speedtest-cli` or `pip install speedtest-cli`")
+        elif kind == "cli":
+            st.info(f"🏆 Using **Ookla speedtest-cli** binary: `{caps.speedtest_cli}`")
+        else:
+            st.info("📦 Using **speedtest-cli Python package** (Ookla servers)")
+        c1, c2 = st.columns([4, 1])
+        rep = caps.report()
+        c1.caption(f"Engines detected {_age_label(time.time() - rep['detected_at'])} in {rep['detect_ms']:.1f} ms "
+                   f"(no subprocesses) · lookup this rerun {lookup_us:.0f} µs"
+                   + "".join(f" · `{m}` import {ms:.0f} ms" for m, ms in rep['import_ms'].items()))
+        if c2.button("🔄 Re-detect", help="Look for newly installed engines"):
+            caps.refresh()
+            st.rerun()
 
-        if st.button("▶️ Run Ookla Speed Test", type="primary", use_container_width=True):
-            with st.spinner("Testing speed via Ookla …"):
-                st.session_state.speed_results = run_okla_speedtest()
-
-        # ── results ──
-        if st.session_state.speed_results:
-            res = st.session_state.speed_results
+        jobs = get_jobs()
+        job  = jobs.latest("speedtest")
+        st.session_state.speed_shown = job.finished if job else None
+        if st.button("▶️ Run Ookla Speed Test", type="primary", use_container_width=True,
+                     disabled=jobs.running("speedtest")):
+            jobs.submit("speedtest", _recorded_speedtest, get_speed_history(), **speed_kwargs)
+            st.rerun()
+        if job is not None and job.done and job.phase == "cancelled":
+            st.warning("⏹️ Last test was cancelled.")
+        elif job is not None and job.done and job.result is None:
+            st.error(f"❌ Speed test failed{': ' + job.error if job.error else ''}")
+        _speedtest_live(int(monitor_interval.replace('s','')) if monitor_interval != "Off" else 0, speed_kwargs)
+
+        # ── results (shared by every session; the store survives restarts) ──
+        last = jobs.last_result("speedtest")
+        res  = last.result if last is not None else get_speed_history().latest()
+        if res is not None:
             m1, m2, m3 = st.columns(3)
-            with m1: st.markdown(create_analog_meter(res['download'], 100, "Download", "Mbps"), unsafe_allow_html=True)
-            with m2: st.markdown(create_analog_meter(res['upload'],   100, "Upload",   "Mbps"), unsafe_allow_html=True)
-            with m3: st.markdown(create_analog_meter(res['ping'],     200, "Ping",     "ms"),   unsafe_allow_html=True)
+            with m1: st.markdown(create_analog_meter(res['download'] or 0, 100, "Download", "Mbps"), unsafe_allow_html=True)
+            with m2: st.markdown(create_analog_meter(res['upload'] or 0,   100, "Upload",   "Mbps"), unsafe_allow_html=True)
+            with m3: st.markdown(create_analog_meter(res['ping'] or 0,     200, "Ping",     "ms"),   unsafe_allow_html=True)
 
             # extra info row
             ic1, ic2, ic3 = st.columns(3)
@@ -694,7 +1190,7 @@ elif mode == "⚡ Ookla Speed Test":
                 st.metric("🔧 Engine", res.get('source','—'))
 
             # quality badge
-            dl = res['download']
+            dl = res['download'] or 0          # a stored result may lack a metric (NULL)
             st.markdown("### 📈 Connection Quality")
             if   dl >= 100: st.success("🚀 Excellent – 4K streaming, gaming, large downloads")
             elif dl >= 50:  st.info   ("✅ Very Good – HD streaming, video calls")
@@ -702,16 +1198,31 @@ elif mode == "⚡ Ookla Speed Test":
             elif dl >= 10:  st.warning("⚠️ Fair – Basic streaming")
             else:           st.error  ("🐌 Poor – Basic browsing only")
 
-            st.caption(f"Tested at {res['timestamp']}")
-
-        # auto re-run
-        if monitor_interval != "Off":
-            secs = int(monitor_interval.replace('s',''))
-            st.info(f"📊 Auto-test every {monitor_interval} …")
-            time.sleep(secs)
-            with st.spinner("Re-testing …"):
-                st.session_state.speed_results = run_okla_speedtest()
-            st.rerun()
+            if res.get('jitter') is not None:
+                st.caption(f"Jitter {res['jitter']} ms · loss {res.get('loss', 0)}%")
+            stamp = res.get('timestamp') or datetime.fromtimestamp(res['ts']).strftime('%Y-%m-%d %H:%M:%S')
+            st.caption(f"Tested at {stamp}" + (f" · took {last.elapsed:.0f}s" if last is not None else ""))
+
+        # ── history ──
+        hist   = get_speed_history()
+        counts = hist.counts()
+        if counts['raw'] or counts['day']:
+            st.markdown("### 📜 History")
+            span  = SPEED_HISTORY_RANGES[st.radio("Range", list(SPEED_HISTORY_RANGES), horizontal=True,
+                                                  key="speed_range", label_visibility="collapsed")]
+            grain = hist.pick_grain(span)
+            rows  = hist.series(time.time() - span, grain=grain)
+            if rows:
+                when = [datetime.fromtimestamp(r['ts']) for r in rows]
+                st.line_chart({'time': when, 'Download': [r['download'] for r in rows],
+                               'Upload': [r['upload'] for r in rows]},
+                              x='time', y=['Download', 'Upload'], y_label="Mbps", height=220)
+                st.line_chart({'time': when, 'Ping': [r['ping'] for r in rows]},
+                              x='time', y='Ping', y_label="ms", height=160)
+            else:
+                st.caption("No results in this range.")
+            st.caption(f"{len(rows)} points at {grain} resolution · {counts['raw']} raw results "
+                       f"(kept {SPEED_RETENTION['raw'] // 86400} days) · {counts['day']} days of rollups")
 
 # ═══════════════════════════════════════════════════════════════
 #  🔑  FIND PASSWORDS
@@ -771,17 +1282,17 @@ elif mode == "🔑 Find Passwords":
                     if st.button("🔌 Connect", key=f"cn_{idx}", use_container_width=True):
                         with st.spinner(f"Connecting to {ssid} …"):
                             if connect_to_wifi(ssid, password if has_pwd else None):
-                                st.success("✅ Connected!"); time.sleep(2); st.rerun()
+                                st.success("✅ Connected!"); get_status_probes().invalidate()
+                                time.sleep(2); st.rerun()
                             else: st.error("❌ Failed")
 
                 if st.session_state.qr_open_ssid == ssid and has_pwd:
-                    qr_buf = generate_wifi_qr(ssid, password, "WPA2")
+                    qr_png = generate_wifi_qr(ssid, password, "WPA2")
                     q1, q2 = st.columns([1,2])
-                    with q1: st.image(qr_buf, width=210)
+                    with q1: st.image(qr_png, width=210)
                     with q2:
                         st.markdown(f"**📲 Scan to share**\n- **SSID:** {ssid}\n- **Security:** WPA2\n- **Password:** {password}")
-                        qr_buf.seek(0)
-                        st.download_button("📥 Download QR", qr_buf, f"{ssid}_wifi_qr.png", "image/png",
+                        st.download_button("📥 Download QR", qr_png, f"{ssid}_wifi_qr.png", "image/png",
                                            key=f"dq_{idx}", use_container_width=True)
                 st.divider()
 
@@ -807,9 +1318,14 @@ elif mode == "🖥️ Router Admin":
               <h4>🖥️ Router Detected</h4>
               <div class="rr-label">IP Address</div>
               <div class="rr-value">{ip} <span class="rr-badge">✔ reachable</span></div>
+              <div class="rr-label">MAC Address</div>
+              <div class="rr-value">{info.get('mac') or '—'}</div>
+              <div class="rr-label">Model</div>
+              <div class="rr-value">{info.get('model') or '—'}</div>
               <div class="rr-label">Brand</div>
               <div class="rr-value">{brand}
                 {'<span class="rr-badge">auto-detected</span>' if brand != 'Generic' else '<span class="rr-badge warn">generic fallback</span>'}
+                {'<span class="rr-badge">cached</span>' if info.get('cached') else ''}
               </div>
             </div>""", unsafe_allow_html=True)
 
@@ -896,23 +1412,72 @@ elif mode == "📱 QR Generator":
 
     if generate and ssid:
         pwd    = "" if security == "nopass" else password
-        qr_buf = generate_wifi_qr(ssid, pwd, security)
+        qr_png = generate_wifi_qr(ssid, pwd, security)
         q1, q2 = st.columns(2)
         with q1:
             st.markdown("#### Network Details")
             st.info(f"**SSID:** {ssid}  \n**Security:** {security}  \n**Type:** {'Open' if security=='nopass' else 'Secured'}")
         with q2:
             st.markdown("#### QR Code")
-            st.image(qr_buf, width=250)
-            qr_buf.seek(0)
-            st.download_button("📥 Download QR Code", qr_buf, f"{ssid}_wifi.png", "image/png", use_container_width=True)
+            st.image(qr_png, width=250)
+            st.download_button("📥 Download QR Code", qr_png, f"{ssid}_wifi.png", "image/png", use_container_width=True)
+
+    # ── bulk export ──
+    st.markdown("---")
+    st.markdown("### 📦 Bulk QR Export")
+    source = st.radio("Source", ["🔑 Saved networks", "📄 CSV file"], horizontal=True)
+    entries = []
+    if source == "🔑 Saved networks":
+        saved = st.session_state.saved_passwords
+        if saved is None:
+            st.info("Fetch saved passwords on the **🔑 Find Passwords** page first.")
+        else:
+            names  = [p['ssid'] for p in saved]
+            chosen = st.multiselect("Networks", names, default=[p['ssid'] for p in saved if p['password']])
+            entries = [p for p in saved if p['ssid'] in chosen]
+    else:
+        up = st.file_uploader("CSV with ssid,password[,security] columns", type=["csv"])
+        if up is not None:
+            entries = read_networks_csv(up.getvalue())
+            st.caption(f"{len(entries)} networks in file")
+
+    fmt = st.radio("Format", ["🗜️ ZIP (PNGs + SVG sheets)", "📄 PDF sheet"], horizontal=True)
+    if st.button("📦 Build Export", disabled=not entries, use_container_width=True):
+        discard_export(st.session_state.bulk_export)
+        st.session_state.bulk_export = None
+        ext  = "zip" if fmt.startswith("🗜️") else "pdf"
+        path = new_export(ext)
+        try:
+            with st.spinner(f"Rendering {len(entries)} QR codes …"):
+                if ext == "zip": export_zip(entries, path, cache=get_qr_cache())
+                else:            export_pdf(entries, path, cache=get_qr_cache())
+        except BaseException:
+            discard_export(path)
+            raise
+        st.session_state.bulk_export = path
+
+    path = st.session_state.bulk_export
+    if path and os.path.exists(path):
+        ext  = path.rsplit(".", 1)[-1]
+        name = f"wifi_qr_{datetime.fromtimestamp(os.path.getmtime(path)):%Y%m%d_%H%M%S}.{ext}"
+        st.caption(f"{os.path.getsize(path) / 1024:,.0f} KB · the file is deleted once downloaded")
+        st.download_button(f"📥 Download {name}", serve_export(path), name,
+                           "application/zip" if ext == "zip" else "application/pdf",
+                           use_container_width=True)
 
 # ── footer ──
 st.markdown("---")
 st.markdown(f"""
 <div style='text-align:center;color:white;'>
-  <p>🖥️ {platform.system()} | 🔧 WiFi Manager Pro v4.0</p>
+  <p>🖥️ {platform.system()} · {select_backend().name} | 🔧 WiFi Manager Pro v4.0</p>
   <p style='font-size:0.85em;opacity:0.85;'>
     Network Scanner • Ookla Speed Test • Saved-Password Finder • Router Admin • QR Sharing
   </p>
-</div>""", unsafe_allow_html=True)
\ No newline at end of file
+</div>""", unsafe_allow_html=True)
+
+TRACER.end(_rerun_span)
+with st.sidebar:
+    st.markdown("---")
+    if st.toggle("🐞 Profiling", key="debug_profiling",
+                 help="Time helpers, count subprocesses and network round trips per rerun"):
+        _profiling_panel()
@@ -0,0 +1,66 @@
+"""
+Engine detection cost: the old per-rerun probe against the capability registry.
+
+"legacy" is what the speed-test page did on every rerun – `which` / `where`
+for both CLI names plus an `import speedtest` attempt – and what
+run_okla_speedtest() repeated per test.  "cold" is a fresh interpreter
+importing capabilities and detecting once; "warm" is the lookup a rerun
+pays afterwards.
+
+    python benchmarks/bench_capabilities.py [reruns]
+"""
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from capabilities import SPEEDTEST_BINARIES, Capabilities
+
+
+def legacy_probe():
+    for name in SPEEDTEST_BINARIES:
+        try:
+            r = subprocess.run(['which' if platform.system() != 'Windows' else 'where', name],
+                               capture_output=True, text=True, timeout=5)
+            if r.returncode == 0:
+                return "cli"
+        except OSError:
+            pass
+    try:
+        import speedtest  # noqa
+        return "python"
+    except ImportError:
+        return "native"
+
+
+def cold_start():
+    code = ("import time; t0 = time.perf_counter(); from capabilities import capabilities; "
+            "capabilities(); print((time.perf_counter() - t0) * 1000)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout)
+
+
+def per_call(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    caps = Capabilities().detect()
+    print(f"engine: legacy={legacy_probe()} registry={caps.speedtest_engine()}")
+    cold = sorted(cold_start() for _ in range(5))[2]
+    legacy = per_call(legacy_probe, reruns)
+    warm = per_call(caps.speedtest_engine, reruns * 1000)
+    print(f"cold start (import + detect, median of 5) | {cold:9.3f} ms")
+    print(f"detect() alone                            | {caps.detect_seconds * 1000:9.3f} ms")
+    print(f"legacy probe per rerun                    | {legacy:9.3f} ms")
+    print(f"registry lookup per rerun                 | {warm * 1000:9.3f} µs")
+    print(f"saved per rerun                           | {legacy - warm:9.3f} ms "
+          f"(x{legacy / warm:,.0f}; legacy ran twice per test – page + run_okla_speedtest)")
@@ -0,0 +1,218 @@
+"""
+Offline replay of recorded platform output through every parser, the
+backends and the scan render path – latency plus allocations per case.
+
+Recorded captures live in benchmarks/fixtures/<platform>/; manifest.json
+says which parser reads each one and which command each backend call
+replays, expected.json holds the result every case must reproduce.
+Dense-site captures (thousands of APs) are generated deterministically by
+synthetic.py in the nmcli, netsh and airport formats.
+
+    python benchmarks/bench_replay.py                        # check + time every case
+    python benchmarks/bench_replay.py --save base.json       # keep the numbers
+    python benchmarks/bench_replay.py --compare base.json    # exit 1 on a regression
+    python benchmarks/bench_replay.py --update               # re-record expected.json
+
+Latency is the best of several timeit repeats; allocations come from
+tracemalloc around one extra call (peak = transient, kept = the result).
+"""
+import argparse
+import fnmatch
+import importlib
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+HERE     = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+sys.path[:0] = [os.path.dirname(HERE), HERE]
+
+import saved_networks
+import wifi_backends
+from scan_records import ScanResult, diff_scans, paginate, table_rows
+from synthetic import CAPTURES, access_points
+
+DENSE_SIZES = (1000, 5000)
+PAGE_SIZE   = 50
+
+
+def read(rel):
+    with open(os.path.join(FIXTURES, rel), newline="") as f:    # keep CRLF captures byte-exact
+        return f.read()
+
+
+def normalize(value):
+    """JSON round trip, so tuples / dicts compare equal to what expected.json stores."""
+    return json.loads(json.dumps(value))
+
+
+def resolve(dotted):
+    module, name = dotted.rsplit(".", 1)
+    return getattr(importlib.import_module(module), name)
+
+# ─────────────────────────────────────────────────────────────
+# CASES  – (name, fn, expected-key or None, size check or None)
+# ─────────────────────────────────────────────────────────────
+def parser_cases(manifest):
+    for entry in manifest["parsers"]:
+        text, parser = read(entry["fixture"]), resolve(entry["parser"])
+        yield f"parse {entry['fixture']}", (lambda p=parser, t=text: p(t)), entry["fixture"], None
+
+
+def replayer(commands):
+    """run(args, timeout) stand-in: the fixture whose command pattern matches `args`."""
+    def run(args, timeout):
+        cmd = " ".join([os.path.basename(args[0])] + [str(a) for a in args[1:]])
+        for pattern, rel in commands.items():
+            if fnmatch.fnmatchcase(cmd, pattern):
+                return read(rel)
+        raise FileNotFoundError(f"no fixture for: {cmd}")
+    return run
+
+
+def saved_entries(platform, items_fn, run):
+    if platform == "linux":
+        items = items_fn(os.path.join(FIXTURES, "linux", "*.nmconnection"))
+    elif platform == "windows":
+        items = items_fn(run, stamps={})
+    else:
+        items = items_fn(run)
+    return [loader() for _, _, loader in items]
+
+
+def backend_cases(manifest):
+    for platform, spec in manifest["backends"].items():
+        run     = replayer(spec["commands"])
+        backend = getattr(wifi_backends, spec["backend"])(run=run)
+        items   = getattr(saved_networks, spec["items"])
+        yield f"{platform} scan",            (lambda b=backend: b.scan(rescan=False)), f"{platform}:scan", None
+        yield f"{platform} current_ssid",    backend.current_ssid,                    f"{platform}:current_ssid", None
+        yield f"{platform} default_gateway", backend.default_gateway,                 f"{platform}:default_gateway", None
+        yield (f"{platform} saved_passwords", (lambda p=platform, i=items, r=run: saved_entries(p, i, r)),
+               f"{platform}:saved_passwords", None)
+
+
+def dense_cases():
+    for n in DENSE_SIZES:
+        aps = access_points(n, seed=n)
+        for fmt, (generate, parser) in CAPTURES.items():
+            text, parse = generate(aps), getattr(wifi_backends, parser)
+            yield f"dense {fmt} x{n}", (lambda p=parse, t=text: p(t)), None, n
+
+
+def render_cases():
+    """parse → ScanResult → diff against the previous scan → sorted, filtered first page."""
+    for n in DENSE_SIZES:
+        text  = CAPTURES["nmcli"][0](access_points(n, seed=n))
+        prev  = ScanResult(wifi_backends.parse_nmcli_terse(CAPTURES["nmcli"][0](access_points(n, seed=n + 1))))
+        nets  = wifi_backends.parse_nmcli_terse(text)
+        cur   = ScanResult(nets)
+        rows  = table_rows(cur)
+
+        def pipeline(t=text, prev=prev):
+            result = ScanResult(wifi_backends.parse_nmcli_terse(t))
+            diff_scans(prev, result)
+            return paginate(table_rows(result, "", None, "Signal", True), 1, PAGE_SIZE)[0]
+
+        yield f"render ScanResult x{n}",     (lambda nets=nets: ScanResult(nets)), None, None
+        yield f"render diff_scans x{n}",     (lambda cur=cur, prev=prev: diff_scans(prev, cur)), None, None
+        yield f"render table_rows x{n}",     (lambda cur=cur: table_rows(cur, "office", "secured", "SSID")), None, None
+        yield f"render paginate x{n}",       (lambda rows=rows: paginate(rows, 3, PAGE_SIZE)), None, None
+        yield f"render scan→page x{n}",      pipeline, None, PAGE_SIZE
+
+
+def all_cases(manifest):
+    yield from parser_cases(manifest)
+    yield from backend_cases(manifest)
+    yield from dense_cases()
+    yield from render_cases()
+
+# ─────────────────────────────────────────────────────────────
+# MEASURING
+# ─────────────────────────────────────────────────────────────
+def measure(fn, repeat=7, min_time=0.05):
+    loops = 1
+    while timeit.timeit(fn, number=loops) < min_time and loops < 1 << 16:
+        loops *= 4
+    best = min(timeit.repeat(fn, number=loops, repeat=repeat)) / loops
+    tracemalloc.start()
+    base   = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {'us': round(best * 1e6, 2), 'peak_kib': round((peak - base) / 1024, 1),
+                    'kept_kib': round((kept - base) / 1024, 1)}
+
+
+def check(result, key, size, expected):
+    if size is not None:
+        return len(result) == size or f"expected {size} rows, got {len(result)}"
+    if key is None:
+        return True
+    if key not in expected:
+        return "no expected result – run with --update"
+    return normalize(result) == expected[key] or f"differs from expected.json[{key!r}]"
+
+
+def regressions(now, base, tolerance):
+    out = []
+    for name, m in now.items():
+        b = base.get(name)
+        if not b:
+            continue
+        if m['us'] > b['us'] * (1 + tolerance) + 2:                   # +2 µs: timer / scheduler noise
+            out.append(f"{name}: {b['us']:.1f} → {m['us']:.1f} µs")
+        if m['peak_kib'] > b['peak_kib'] * (1 + tolerance) + 1:        # +1 KiB: tracemalloc noise
+            out.append(f"{name}: peak {b['peak_kib']:.1f} → {m['peak_kib']:.1f} KiB")
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--save", metavar="JSON", help="write the measurements here")
+    ap.add_argument("--compare", metavar="JSON", help="baseline written by --save")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / growth (default 0.25)")
+    ap.add_argument("--update", action="store_true", help="rewrite fixtures/expected.json from the current parsers")
+    ap.add_argument("-k", metavar="TEXT", default="", help="only cases whose name contains TEXT")
+    args = ap.parse_args()
+
+    with open(os.path.join(FIXTURES, "manifest.json")) as f:
+        manifest = json.load(f)
+    expected_path = os.path.join(FIXTURES, "expected.json")
+    expected = {}
+    if os.path.exists(expected_path):
+        with open(expected_path, encoding="utf-8") as f:
+            expected = json.load(f)
+
+    results, failures = {}, []
+    print(f"{'case':<48} | {'µs':>10} | {'peak KiB':>9} | {'kept KiB':>9} | check")
+    for name, fn, key, size in all_cases(manifest):
+        if args.k not in name:
+            continue
+        result, m = measure(fn)
+        if args.update and key is not None:
+            expected[key] = normalize(result)
+        ok = check(result, key, size, expected)
+        if ok is not True:
+            failures.append(f"{name}: {ok}")
+        results[name] = m
+        print(f"{name:<48} | {m['us']:>10.1f} | {m['peak_kib']:>9.1f} | {m['kept_kib']:>9.1f} | "
+              f"{'ok' if ok is True else 'FAIL'}")
+
+    if args.update:
+        with open(expected_path, "w", encoding="utf-8") as f:
+            json.dump(expected, f, indent=1, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"wrote {os.path.relpath(expected_path)}")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+    slower = []
+    if args.compare:
+        with open(args.compare) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+    for line in failures + slower:
+        print("✗", line)
+    sys.exit(1 if failures or slower else 0)
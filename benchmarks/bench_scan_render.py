@@ -0,0 +1,49 @@
+"""
+Scanner page render time vs. AP count: paged table view vs. card view.
+
+Drives app.py headlessly through streamlit.testing with a synthetic
+backend, so no WiFi hardware is needed.
+
+    python benchmarks/bench_scan_render.py [aps ...]
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+import wifi_backends
+from streamlit.logger import get_logger
+from streamlit.testing.v1 import AppTest
+from synthetic import SyntheticBackend, access_points
+
+CARDS_MAX = 600                 # the card view gets slow enough above this to dominate the run
+
+
+def render_times(n, layout, runs=5):
+    wifi_backends._selected = SyntheticBackend(access_points(n, seed=n))
+    st.cache_resource.clear()                   # fresh scanner, so the first scan sees this backend
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+    at.run()
+    while not at.success:                       # first scan happens on the background thread
+        time.sleep(0.2); at.run()
+    at.radio(key="scan_layout").set_value(layout).run()
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter(); at.run()
+        times.append(time.perf_counter() - t0)
+    assert not at.exception, [e.value for e in at.exception]
+    return statistics.median(times), at.success[0].value
+
+
+if __name__ == "__main__":
+    get_logger("streamlit").setLevel("ERROR")
+    print(f"{'APs':>6} | {'table':>9} | {'cards':>9} | page")
+    for n in [int(a) for a in sys.argv[1:]] or [50, 150, 500, 1500, 5000]:
+        table, found = render_times(n, "📋 Table")
+        cards = f"{render_times(n, '🗂️ Cards')[0]*1e3:7.0f}ms" if n <= CARDS_MAX else "  skipped"
+        print(f"{n:>6} | {table*1e3:7.0f}ms | {cards} | {found}")
+    os._exit(0)                                 # don't wait on the scanner threads of every run
@@ -0,0 +1,39 @@
+"""
+Check the multi-stream throughput engine against the bundled local server.
+
+For each stream count the engine's byte count is compared with the
+server's own tally, and with a paced server the reported rate is compared
+with the configured limit.
+
+    python benchmarks/bench_throughput.py [limit_mbps]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from throughput import LocalTestServer, measure_download, measure_upload
+
+DURATION, WARMUP = 4.0, 1.0
+
+
+def run(srv, label, fn, url, streams, tally):
+    srv.reset()
+    r = fn(url, streams=streams, duration=DURATION, warmup=WARMUP)
+    time.sleep(0.2)                              # let in-flight server writes land in the tally
+    server = getattr(srv, tally)
+    drift  = abs(r['bytes'] - server) / server * 100 if server else 0
+    err    = f" | vs limit {abs(r['mbps'] - srv.limit_mbps) / srv.limit_mbps * 100:5.1f}%" if srv.limit_mbps else ""
+    print(f"{label:>8} x{streams:<2} | {r['mbps']:10.1f} Mbps | peak {r['peak_mbps']:10.1f} | "
+          f"client/server bytes {drift:4.2f}% apart{err}")
+
+
+if __name__ == "__main__":
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    for lim in ([limit] if limit else [None, 200.0]):
+        print(f"── local server, {'unlimited' if lim is None else f'paced at {lim:g} Mbps'} ──")
+        with LocalTestServer(limit_mbps=lim) as srv:
+            for n in (1, 4, 8):
+                run(srv, "download", measure_download, srv.download_url, n, "sent")
+                run(srv, "upload",   measure_upload,   srv.upload_url,   n, "received")
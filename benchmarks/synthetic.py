@@ -0,0 +1,111 @@
+"""
+Deterministic synthetic captures for dense sites.
+
+Real recordings live in benchmarks/fixtures/; these generators produce the
+same formats at any size (thousands of APs) so parsers can be timed
+without shipping megabytes of text.
+"""
+import random
+
+SSID_WORDS = ["Office", "Guest", "Lab", "Floor", "Corp", "IoT", "Cafe", "Meeting Room", "Lobby",
+              "HR: Private", "Back\\Office", "Print", "Cam", "Mesh"]
+SECURITIES = ["WPA2", "WPA2 WPA3", "WPA1 WPA2", "WPA3", "", "WPA2 802.1X"]
+CHANNELS   = [(1, 2412), (6, 2437), (11, 2462), (36, 5180), (44, 5220), (149, 5745), (37, 6135)]
+
+
+def access_points(n, seed=0):
+    """n synthetic APs: dicts with ssid, bssid, signal, security, channel, freq, rate."""
+    rnd = random.Random(seed)
+    aps = []
+    for i in range(n):
+        ssid = f"{rnd.choice(SSID_WORDS)} {i % max(1, n // 4)}" if rnd.random() > 0.03 else ""
+        chan, freq = rnd.choice(CHANNELS)
+        aps.append({'ssid': ssid,
+                    'bssid': ":".join(f"{rnd.randrange(256):02X}" for _ in range(6)),
+                    'signal': rnd.randrange(5, 100),
+                    'security': rnd.choice(SECURITIES),
+                    'channel': chan, 'freq': freq,
+                    'rate': rnd.choice([54, 130, 270, 540, 1201])})
+    return aps
+
+
+def _esc(v):
+    return v.replace("\\", "\\\\").replace(":", "\\:")
+
+
+def nmcli_terse(aps):
+    """`nmcli -t -e yes -f SSID,BSSID,SIGNAL,SECURITY,CHAN,FREQ,RATE,MODE dev wifi list`"""
+    return "".join(f"{_esc(a['ssid'])}:{_esc(a['bssid'])}:{a['signal']}:{a['security']}:{a['channel']}:"
+                   f"{a['freq']} MHz:{a['rate']} Mbit/s:Infra\n" for a in aps)
+
+
+def nmcli_table(aps):
+    """Legacy human-readable `nmcli -f SSID,SIGNAL,SECURITY,CHAN dev wifi list`."""
+    w = max(4, max((len(a['ssid']) for a in aps), default=4)) + 2
+    rows = [f"{'SSID':<{w}}SIGNAL  {'SECURITY':<16}CHAN"]
+    for a in aps:
+        rows.append(f"{(a['ssid'] or '--'):<{w}}{a['signal']:<8}{(a['security'] or '--'):<16}{a['channel']}")
+    return "\n".join(rows) + "\n"
+
+
+_NETSH_AUTH   = {"": "Open", "WPA3": "WPA3-Personal", "WPA2 802.1X": "WPA2-Enterprise"}
+_AIRPORT_SEC  = {"": "NONE", "WPA3": "RSN(PSK,SAE/AES/AES)", "WPA1 WPA2": "WPA(PSK/AES,TKIP/TKIP) WPA2(PSK/AES,TKIP/TKIP)",
+                 "WPA2 802.1X": "WPA2(802.1x/AES/AES)"}
+
+
+def netsh_networks(aps):
+    """`netsh wlan show networks mode=bssid` – one SSID block per name, CRLF like the console."""
+    groups = {}
+    for a in aps:
+        groups.setdefault(a['ssid'], []).append(a)
+    out = ["", "Interface name : Wi-Fi", f"There are {len(groups)} networks currently visible.", ""]
+    for i, (ssid, group) in enumerate(groups.items(), 1):
+        out += [f"SSID {i} : {ssid}",
+                "    Network type            : Infrastructure",
+                f"    Authentication          : {_NETSH_AUTH.get(group[0]['security'], 'WPA2-Personal')}",
+                "    Encryption              : CCMP"]
+        for j, a in enumerate(group, 1):
+            out += [f"    BSSID {j}                 : {a['bssid'].lower()}",
+                    f"         Signal             : {a['signal']}%",
+                    "         Radio type         : 802.11ax",
+                    f"         Channel            : {a['channel']}",
+                    "         Basic rates (Mbps) : 6 12 24",
+                    "         Other rates (Mbps) : 9 18 36 48 54"]
+        out.append("")
+    return "\r\n".join(out) + "\r\n"
+
+
+def airport_scan(aps):
+    """`airport -s` – right-aligned SSIDs, RSSI in dBm."""
+    rows = [f"{'SSID':>32} BSSID             RSSI CHANNEL HT CC SECURITY (auth/unicast/group)"]
+    for a in aps:
+        rssi = a['signal'] * 60 // 100 - 90
+        rows.append(f"{a['ssid']:>32} {a['bssid'].lower()} {rssi:<4} {a['channel']:<7} Y  US "
+                    f"{_AIRPORT_SEC.get(a['security'], 'WPA2(PSK/AES/AES)')}")
+    return "\n".join(rows) + "\n"
+
+
+CAPTURES = {                   # format → (generator, parser name in wifi_backends)
+    'nmcli':   (nmcli_terse,    'parse_nmcli_terse'),
+    'netsh':   (netsh_networks, 'parse_netsh_networks'),
+    'airport': (airport_scan,   'parse_airport_networks'),
+}
+
+
+class SyntheticBackend:
+    """Stands in for select_backend(): scans return `aps` through the real nmcli terse parser."""
+
+    name = "synthetic"
+
+    def __init__(self, aps):
+        self.aps = aps
+
+    def scan(self, rescan=True):
+        from wifi_backends import parse_nmcli_terse
+        return parse_nmcli_terse(nmcli_terse(self.aps))
+
+    def current_ssid(self):
+        return None
+
+    def default_gateway(self):
+        return None
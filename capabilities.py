@@ -0,0 +1,117 @@
+"""
+Process-wide registry of optional engines, binaries and modules.
+
+Binaries are located with shutil.which() and modules with
+importlib.util.find_spec(), so detection never spawns a process or
+executes an optional package.  Everything is detected once per process
+(refresh() re-detects on demand); modules are imported only when load()
+is first called for them.  Detection and import costs are recorded so the
+UI can report what the registry saves per rerun.
+"""
+import importlib
+import importlib.util
+import shutil
+import threading
+import time
+
+SPEEDTEST_BINARIES = ("speedtest", "speedtest-cli")
+SPEEDTEST_MODULE   = "speedtest"
+
+# every name here has a reader: the nmcli backend, the NetworkManager event
+# monitor (gdbus, falling back to nmcli) and the gateway MAC lookup (arp)
+DEFAULT_BINARIES = SPEEDTEST_BINARIES + ("nmcli", "gdbus", "arp")
+DEFAULT_MODULES  = (SPEEDTEST_MODULE,)
+
+
+class Capabilities:
+    """Detected-once view of what this host can run."""
+
+    def __init__(self, binaries=DEFAULT_BINARIES, modules=DEFAULT_MODULES):
+        self.names_binaries = tuple(binaries)
+        self.names_modules  = tuple(modules)
+        self.binaries = {}            # name → path or None
+        self.modules  = {}            # name → True / False (importable, not imported)
+        self.detected_at    = None
+        self.detect_seconds = None
+        self.detections     = 0
+        self.import_seconds = {}      # name → seconds spent in its first import
+        self._loaded = {}
+        self._lock   = threading.Lock()
+
+    def detect(self):
+        t0 = time.perf_counter()
+        binaries = {b: shutil.which(b) for b in self.names_binaries}
+        modules  = {m: importlib.util.find_spec(m) is not None for m in self.names_modules}
+        with self._lock:
+            self.binaries, self.modules = binaries, modules
+            self.detect_seconds = time.perf_counter() - t0
+            self.detected_at = time.time()
+            self.detections += 1
+        return self
+
+    def refresh(self):
+        """Re-detect everything and forget lazily imported modules that have gone missing."""
+        importlib.invalidate_caches()           # let find_spec() see packages installed since start-up
+        self.detect()
+        with self._lock:
+            for name in [n for n in self._loaded if not self.modules.get(n)]:
+                del self._loaded[name]
+        return self
+
+    # ── lookups (dict hits) ──
+    def binary(self, name):
+        return self.binaries.get(name)
+
+    def first_binary(self, names):
+        return next((self.binaries[n] for n in names if self.binaries.get(n)), None)
+
+    def has_module(self, name):
+        return bool(self.modules.get(name))
+
+    def load(self, name):
+        """Import `name` on first use; ImportError if it is not available."""
+        mod = self._loaded.get(name)
+        if mod is not None:
+            return mod
+        if not self.has_module(name):
+            raise ImportError(name)
+        t0  = time.perf_counter()
+        mod = importlib.import_module(name)
+        with self._lock:
+            self._loaded[name] = mod
+            self.import_seconds.setdefault(name, time.perf_counter() - t0)
+        return mod
+
+    # ── speed test ──
+    @property
+    def speedtest_cli(self):
+        return self.first_binary(SPEEDTEST_BINARIES)
+
+    def speedtest_engine(self, native_only=False):
+        """'cli', 'python' or 'native' – the engine run_okla_speedtest() will try first."""
+        if native_only:
+            return "native"
+        if self.speedtest_cli:
+            return "cli"
+        return "python" if self.has_module(SPEEDTEST_MODULE) else "native"
+
+    def report(self):
+        return {'detect_ms': round((self.detect_seconds or 0) * 1000, 2),
+                'detected_at': self.detected_at,
+                'detections': self.detections,
+                'binaries': dict(self.binaries),
+                'modules': dict(self.modules),
+                'import_ms': {k: round(v * 1000, 2) for k, v in self.import_seconds.items()}}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def capabilities():
+    """The process-wide registry, detected on first call."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = Capabilities().detect()
+        return _registry
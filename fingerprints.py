@@ -0,0 +1,154 @@
+"""
+Router fingerprint index.
+
+Maps HTTP `Server` headers, `WWW-Authenticate` realms, page <title>s and
+favicon MD5s to a brand (and model where known).  Lookups are plain dict
+hits on a normalised key, so identifying a router costs one HTTP response
+and a handful of O(1) probes – plus a /favicon.ico fetch only when the
+page alone is not enough and the table holds favicon hashes at all.
+
+The bundled table lives in router_fingerprints.json; users extend or
+override it with the same layout in ~/.wifi_manager/fingerprints.json.
+"""
+import hashlib
+import json
+import os
+import re
+
+BUNDLED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_fingerprints.json")
+USER_PATH    = os.path.join(os.path.expanduser("~"), ".wifi_manager", "fingerprints.json")
+
+KINDS = ("server", "realm", "title", "favicon")
+
+# words a first-word match must not mistake for a model ("NETGEAR Router Login",
+# "TP-LINK Wireless N Router WR841N"); single letters are dropped as well
+MODEL_STOPWORDS = {"login", "log", "in", "admin", "administration", "web", "webserver", "server", "httpd",
+                   "router", "wireless", "gateway", "home", "page", "setup", "management", "interface",
+                   "configuration", "status", "welcome", "to", "the", "smart", "wi-fi", "wifi",
+                   "ac", "ax", "dual", "tri", "band", "gigabit", "mesh", "modem", "cable", "dsl", "adsl",
+                   "adsl2+", "vdsl", "access", "point", "ap", "series", "new", "high", "speed", "power"}
+
+_VERSION_RE = re.compile(r"/[\w.\-]*\d[\w.\-]*")
+_SPACE_RE   = re.compile(r"\s+")
+_SEP_RE     = re.compile(r"[|:·•–—()\[\]<>,;]+|\s-\s|^-|-$")
+_VERNUM_RE  = re.compile(r"^v?\d+(\.\d+)+\w*$", re.I)
+_RATE_RE    = re.compile(r"^(n|ac|ax|be)\d{3,5}$", re.I)      # speed classes: N300, AC1750
+_TITLE_RE   = re.compile(rb"<title[^>]*>(.*?)</title>", re.I | re.S)
+_REALM_RE   = re.compile(r'realm="?([^",]*)', re.I)
+
+
+def normalize(value):
+    """Lower-case, drop `/1.2.3` version suffixes, collapse whitespace."""
+    value = _VERSION_RE.sub("", value or "")
+    return _SPACE_RE.sub(" ", value).strip().lower()
+
+
+def extract_title(body):
+    m = _TITLE_RE.search(body or b"")
+    return m.group(1).decode("utf-8", errors="ignore").strip() if m else None
+
+
+def extract_realm(header):
+    m = _REALM_RE.search(header or "")
+    return m.group(1).strip() if m else None
+
+
+def favicon_hash(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def derive_model(rest):
+    """
+    Model guess from what follows the brand in an observed value: version
+    numbers, speed classes, separators, single letters and MODEL_STOPWORDS
+    removed; None if nothing is left.
+    """
+    words = _SEP_RE.sub(" ", _VERSION_RE.sub("", rest or "")).split()
+    words = [w for w in words
+             if len(w) > 1 and w.lower() not in MODEL_STOPWORDS
+             and not _VERNUM_RE.match(w) and not _RATE_RE.match(w)]
+    return " ".join(words) or None
+
+
+class FingerprintIndex:
+    """Hashed (kind, key) → {'brand', 'model'} table."""
+
+    def __init__(self):
+        self.exact  = {}              # (kind, key)        → entry
+        self.prefix = {}              # (kind, first word) → entry
+        self.kinds  = set()           # kinds with at least one entry
+
+    # ── building ──
+    def add(self, kind, key, brand, model=None):
+        entry = {'brand': brand, 'model': model}
+        key   = normalize(key)
+        self.kinds.add(kind)
+        if key.endswith("*"):
+            self.prefix[(kind, key[:-1].strip())] = entry
+        else:
+            self.exact[(kind, key)] = entry
+
+    def update(self, table):
+        """Merge a {kind: {key: {'brand', 'model'}}} mapping (the JSON layout)."""
+        for kind in KINDS:
+            for key, entry in (table.get(kind) or {}).items():
+                self.add(kind, key, entry['brand'], entry.get('model'))
+        return self
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return self.update(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return self
+
+    @classmethod
+    def default(cls, user_path=USER_PATH):
+        return cls().load(BUNDLED_PATH).load(user_path)
+
+    def __len__(self):
+        return len(self.exact) + len(self.prefix)
+
+    def has(self, kind):
+        """True if any entry of `kind` is loaded – probes for an absent kind can be skipped."""
+        return kind in self.kinds
+
+    # ── lookup ──
+    def _match(self, kind, value):
+        """(table entry or None, model derived from a first-word match or None)."""
+        if not value:
+            return None, None
+        key = normalize(value)
+        hit = self.exact.get((kind, key))
+        if hit:
+            return hit, None
+        hit = self.prefix.get((kind, key.partition(" ")[0]))
+        if hit:
+            parts = value.strip().split(None, 1)
+            return hit, derive_model(parts[1]) if len(parts) > 1 else None
+        return None, None
+
+    def lookup(self, kind, value):
+        """Return {'brand', 'model', 'via'} for one observed value, or None."""
+        entry, derived = self._match(kind, value)
+        return dict(entry, model=entry['model'] or derived, via=kind) if entry else None
+
+    def identify(self, resp):
+        """
+        Identify a router from one HTTP response dict ({'headers', 'body'}).
+        A model from the table beats one derived from a first-word match,
+        which beats a brand alone; headers beat the title.
+        """
+        headers = resp.get('headers') or {}
+        observed = (("server", headers.get('server')),
+                    ("realm",  extract_realm(headers.get('www-authenticate'))),
+                    ("title",  extract_title(resp.get('body'))))
+        hits = [(kind, *self._match(kind, value)) for kind, value in observed]
+        hits = [(kind, entry, derived) for kind, entry, derived in hits if entry]
+        for kind, entry, _ in hits:
+            if entry['model']:
+                return dict(entry, via=kind)
+        for kind, entry, derived in hits:
+            if derived:
+                return dict(entry, model=derived, via=kind)
+        return dict(hits[0][1], via=hits[0][0]) if hits else None
@@ -0,0 +1,256 @@
+"""
+In-process network probes for WiFi Manager Pro.
+
+Latency is measured as TCP-connect time (SYN → SYN/ACK) with asyncio, so a
+probe costs a socket, not a fork/exec of `ping`.  Every function takes its
+targets as (host, port) pairs, which makes them easy to point at a local
+listener.
+"""
+import asyncio
+import math
+import ssl
+import time
+from urllib.parse import urlsplit
+
+# Public anycast resolvers answer on 53/443 almost everywhere.
+DEFAULT_TARGETS = (("1.1.1.1", 443), ("8.8.8.8", 443), ("9.9.9.9", 443))
+
+# ─────────────────────────────────────────────────────────────
+# PRIMITIVES
+# ─────────────────────────────────────────────────────────────
+async def tcp_connect_rtt(host, port, timeout=1.0):
+    """Return the TCP handshake time in ms, or None on timeout / refusal."""
+    t0 = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    rtt = (time.perf_counter() - t0) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return rtt
+
+
+def _percentile(sorted_vals, pct):
+    """Nearest-rank percentile of an already-sorted list."""
+    if not sorted_vals:
+        return None
+    k = max(0, math.ceil(pct / 100 * len(sorted_vals)) - 1)
+    return sorted_vals[k]
+
+
+def summarize(rtts, sent, series=None):
+    """
+    Reduce a list of RTT samples (ms) into a stats dict.  When the samples
+    come from several targets, pass each target's list in `series`: jitter
+    is then taken within each target and averaged over all their intervals,
+    never across two targets' samples.
+    """
+    vals = sorted(rtts)
+    n    = len(vals)
+    # jitter: mean absolute difference between consecutive samples (RFC 3550 style)
+    steps  = [abs(b - a) for s in (series if series is not None else [rtts]) for a, b in zip(s, s[1:])]
+    jitter = sum(steps) / len(steps) if steps else 0.0
+    r2 = lambda v: round(v, 2) if v is not None else None
+    return {
+        'reachable': n > 0,
+        'sent':      sent,
+        'received':  n,
+        'loss':      round(100 * (sent - n) / sent, 1) if sent else 0.0,
+        'min':       r2(vals[0]  if vals else None),
+        'avg':       r2(sum(vals) / n if vals else None),
+        'p50':       r2(_percentile(vals, 50)),
+        'p95':       r2(_percentile(vals, 95)),
+        'max':       r2(vals[-1] if vals else None),
+        'jitter':    r2(jitter),
+    }
+
+# ─────────────────────────────────────────────────────────────
+# PROBES
+# ─────────────────────────────────────────────────────────────
+async def _sample_target(host, port, samples, timeout, interval):
+    rtts = []
+    for i in range(samples):
+        rtt = await tcp_connect_rtt(host, port, timeout)
+        if rtt is not None:
+            rtts.append(rtt)
+        if interval and i < samples - 1:
+            await asyncio.sleep(interval)
+    return rtts
+
+
+async def probe_latency_async(targets=DEFAULT_TARGETS, samples=10, timeout=1.0, interval=0.05):
+    targets = list(targets)
+    per = await asyncio.gather(*(_sample_target(h, p, samples, timeout, interval) for h, p in targets))
+    report = summarize([r for rtts in per for r in rtts], samples * len(targets), series=per)
+    report['targets'] = {f"{h}:{p}": summarize(rtts, samples) for (h, p), rtts in zip(targets, per)}
+    return report
+
+
+def probe_latency(targets=DEFAULT_TARGETS, samples=10, timeout=1.0, interval=0.05):
+    """
+    Sample every target `samples` times concurrently and return a stats dict:
+    reachable, sent, received, loss (%), min/avg/p50/p95/max and jitter (ms),
+    plus the same breakdown per target under 'targets'.
+    """
+    return asyncio.run(probe_latency_async(targets, samples, timeout, interval))
+
+
+async def is_reachable_async(targets=DEFAULT_TARGETS, timeout=1.0):
+    tasks = [asyncio.ensure_future(tcp_connect_rtt(h, p, timeout)) for h, p in targets]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            if await fut is not None:
+                return True
+        return False
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+def is_reachable(targets=DEFAULT_TARGETS, timeout=1.0):
+    """True as soon as any target completes a TCP handshake."""
+    return asyncio.run(is_reachable_async(targets, timeout))
+
+# ─────────────────────────────────────────────────────────────
+# GATEWAY SWEEP
+# ─────────────────────────────────────────────────────────────
+async def sweep_async(hosts, ports=(80, 8080), timeout=1.0, deadline=None, first=False):
+    async def one(host, port):
+        return host, port, await tcp_connect_rtt(host, port, timeout)
+
+    loop  = asyncio.get_running_loop()
+    end   = loop.time() + (deadline if deadline is not None else timeout + 0.25)
+    tasks = {asyncio.ensure_future(one(h, p)) for h in hosts for p in ports}
+    found = {}                        # host → (port, rtt)
+    try:
+        while tasks:
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            done, tasks = await asyncio.wait(tasks, timeout=remaining,
+                                             return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                host, port, rtt = t.result()
+                if rtt is not None and (host not in found or rtt < found[host][1]):
+                    found[host] = (port, rtt)
+            if first and found:
+                break
+    finally:
+        for t in tasks:
+            t.cancel()
+    return sorted(({'ip': h, 'port': p, 'rtt': round(r, 2)} for h, (p, r) in found.items()),
+                  key=lambda x: x['rtt'])
+
+
+def sweep(hosts, ports=(80, 8080), timeout=1.0, deadline=None, first=False):
+    """
+    Connect to every host × port at once and return the responsive hosts as
+    [{'ip', 'port', 'rtt'}] ranked by RTT.  The whole sweep is bounded by
+    `deadline` (default: one timeout); with first=True it stops at the first
+    host that answers.
+    """
+    return asyncio.run(sweep_async(hosts, ports, timeout, deadline, first))
+
+# ─────────────────────────────────────────────────────────────
+# HTTP (router pages)
+# ─────────────────────────────────────────────────────────────
+# every proto/port combination a router admin page commonly answers on
+HTTP_ENDPOINTS = tuple((proto, port) for proto in ("http", "https") for port in (80, 8080, 443, 8443))
+
+_ssl_ctx = None
+
+
+def insecure_ssl_context():
+    """One shared context for self-signed router certificates."""
+    global _ssl_ctx
+    if _ssl_ctx is None:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode    = ssl.CERT_NONE
+        _ssl_ctx = ctx
+    return _ssl_ctx
+
+
+async def _http_once(host, port, tls, path, method, max_body):
+    reader, writer = await asyncio.open_connection(
+        host, port, ssl=insecure_ssl_context() if tls else None)
+    try:
+        writer.write((f"{method} {path} HTTP/1.0\r\nHost: {host}\r\n"
+                      f"User-Agent: Mozilla/5.0\r\nAccept: */*\r\nConnection: close\r\n\r\n").encode())
+        await writer.drain()
+        head  = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ", 2)
+        status  = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        body = b""
+        if method != "HEAD":
+            while len(body) < max_body:
+                chunk = await reader.read(max_body - len(body))
+                if not chunk:
+                    break
+                body += chunk
+        return {'status': status, 'headers': headers, 'body': body}
+    finally:
+        writer.close()
+
+
+async def http_get_async(host, port, tls=False, path="/", timeout=3.0, max_body=8192,
+                         method="GET", max_redirects=2):
+    """
+    Minimal HTTP/1.0 client – returns {'status', 'headers', 'body', 'url'}.
+    Redirects are followed only while they stay on the same host.
+    """
+    async def go():
+        nonlocal port, tls, path
+        for _ in range(max_redirects + 1):
+            resp = await _http_once(host, port, tls, path, method, max_body)
+            resp['url'] = f"{'https' if tls else 'http'}://{host}:{port}{path}"
+            loc = resp['headers'].get('location')
+            if resp['status'] not in (301, 302, 303, 307, 308) or not loc:
+                return resp
+            u = urlsplit(loc)
+            if u.hostname and u.hostname != host:
+                return resp
+            if u.scheme:
+                tls  = u.scheme == "https"
+                port = u.port or (443 if tls else 80)
+            path = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        return resp
+    return await asyncio.wait_for(go(), timeout)
+
+
+async def race_http_async(host, match, endpoints=HTTP_ENDPOINTS, timeout=3.0, **kw):
+    async def one(proto, port):
+        return match(await http_get_async(host, port, tls=proto == "https", timeout=timeout, **kw))
+
+    tasks = [asyncio.ensure_future(one(proto, port)) for proto, port in endpoints]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                result = await fut
+            except Exception:
+                continue
+            if result is not None:
+                return result
+        return None
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+def race_http(host, match, endpoints=HTTP_ENDPOINTS, timeout=3.0, **kw):
+    """
+    GET every endpoint of `host` in parallel and pass each response to
+    `match`; the first non-None return value wins and the remaining
+    requests are cancelled.  Returns None when nothing matched.
+    """
+    return asyncio.run(race_http_async(host, match, endpoints, timeout, **kw))
@@ -0,0 +1,277 @@
+"""
+WiFi QR rendering with a bounded LRU cache, a batch API and bulk export.
+
+PNG bytes are cached by (ssid, password, security, size), so reopening a QR
+panel serves the stored bytes instead of rebuilding the matrix and
+re-encoding the image.  render_batch() fans cache misses out to a process
+pool – QR encoding is pure-Python CPU work and does not scale on threads.
+The pool is started on first use and shared by every later batch, so an
+export pays the worker start-up once, not once per chunk.
+
+The export helpers render one page worth of codes at a time and write it
+straight to the output file, so a ZIP or PDF of hundreds of networks never
+sits in memory as a whole.
+"""
+import base64
+import csv
+import io
+import multiprocessing
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+BATCH_INLINE_MAX = 4            # below this, a pool costs more than it saves
+
+
+def wifi_payload(ssid, password, security="WPA"):
+    return f"WIFI:T:{security};S:{ssid};P:{password};;"
+
+
+def render_qr_png(ssid, password, security="WPA", size=10):
+    """Encode one WiFi QR code and return the PNG as bytes."""
+    qr = qrcode.QRCode(version=1, box_size=size, border=4)
+    qr.add_data(wifi_payload(ssid, password, security))
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buf = BytesIO(); img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _render_key(key):
+    return render_qr_png(*key)
+
+
+_pool      = None
+_pool_lock = threading.Lock()
+
+
+def render_pool(max_workers=None, reset=False):
+    """The process-wide render pool, created on first use (`max_workers` only applies then)."""
+    global _pool
+    with _pool_lock:
+        if reset and _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            # spawn, not fork: a forked child of the multi-threaded Streamlit server
+            # can inherit a lock some other thread holds and hang on it
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+class QRCache:
+    """LRU of PNG bytes bounded by entry count and total size."""
+
+    def __init__(self, max_items=256, max_bytes=8 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits   = 0
+        self.misses = 0
+        self._lock  = threading.Lock()
+        self._items = OrderedDict()   # key → png bytes
+
+    @staticmethod
+    def key(ssid, password, security="WPA", size=10):
+        return (ssid, password or "", security, int(size))
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._items[key] = png
+            self.nbytes += len(png)
+            while self._items and (len(self._items) > self.max_items or self.nbytes > self.max_bytes):
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+    def render(self, ssid, password, security="WPA", size=10):
+        """Return cached PNG bytes, rendering (and caching) on a miss."""
+        k   = self.key(ssid, password, security, size)
+        png = self.get(k)
+        if png is None:
+            png = render_qr_png(*k)
+            self.put(k, png)
+        return png
+
+    def render_batch(self, items, max_workers=None):
+        """
+        Render many QR codes at once.  `items` are (ssid, password, security[, size])
+        tuples; returns PNG bytes in the same order.  Misses are rendered
+        on the shared render_pool() and stored in the cache.
+        """
+        keys    = [self.key(*it) for it in items]
+        results = [self.get(k) for k in keys]
+        missing = list(dict.fromkeys(k for k, png in zip(keys, results) if png is None))
+        if missing:
+            if len(missing) <= BATCH_INLINE_MAX:
+                rendered = [_render_key(k) for k in missing]
+            else:
+                chunksize = max(1, len(missing) // 16)
+                try:
+                    rendered = list(render_pool(max_workers).map(_render_key, missing, chunksize=chunksize))
+                except BrokenProcessPool:        # a worker died – start a fresh pool once
+                    rendered = list(render_pool(max_workers, reset=True).map(_render_key, missing, chunksize=chunksize))
+            fresh = dict(zip(missing, rendered))
+            for k, png in fresh.items():
+                self.put(k, png)
+            results = [png if png is not None else fresh[k] for k, png in zip(keys, results)]
+        return results
+
+
+# ─────────────────────────────────────────────────────────────
+# BULK EXPORT
+# ─────────────────────────────────────────────────────────────
+PAGE_SIZE = (1240, 1754)        # A4 @ 150 dpi
+SHEET_COLS, SHEET_ROWS = 3, 4
+EXPORT_CHUNK = 48               # codes rendered per render-pool round
+
+
+def default_security(entry):
+    return entry.get('security') or ("WPA2" if entry.get('password') else "nopass")
+
+
+def read_networks_csv(data):
+    """
+    Parse a CSV of networks (str, bytes or text file).  Columns are matched
+    by header name (ssid / password / security, any case); without a header
+    they are taken positionally.
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig", errors="ignore")
+    rows = list(csv.reader(io.StringIO(data) if isinstance(data, str) else data))
+    if not rows:
+        return []
+    head = [c.strip().lower() for c in rows[0]]
+    if "ssid" in head:
+        idx  = {k: head.index(k) if k in head else None for k in ("ssid", "password", "security")}
+        rows = rows[1:]
+    else:
+        idx  = {"ssid": 0, "password": 1, "security": 2}
+    cell = lambda r, k: r[idx[k]].strip() if idx[k] is not None and idx[k] < len(r) else ""
+    return [{'ssid': cell(r, "ssid"), 'password': cell(r, "password"), 'security': cell(r, "security") or None}
+            for r in rows if r and cell(r, "ssid")]
+
+
+def iter_qr_pngs(entries, cache=None, chunk=EXPORT_CHUNK):
+    """Yield (entry, png_bytes), rendering `chunk` entries at a time in parallel."""
+    cache = cache or QRCache(max_items=chunk)
+    for i in range(0, len(entries), chunk):
+        part = entries[i:i + chunk]
+        pngs = cache.render_batch([(e['ssid'], e.get('password') or "", default_security(e)) for e in part])
+        yield from zip(part, pngs)
+
+
+def _pages(entries, cache):
+    per_page = SHEET_COLS * SHEET_ROWS
+    page = []
+    for item in iter_qr_pngs(entries, cache):
+        page.append(item)
+        if len(page) == per_page:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _safe_name(ssid, seen):
+    base = re.sub(r"[^\w.-]+", "_", ssid).strip("_") or "network"
+    name, n = base, 1
+    while name in seen:
+        n += 1
+        name = f"{base}_{n}"
+    seen.add(name)
+    return name
+
+
+def _cells():
+    w, h = PAGE_SIZE
+    cw, ch = w // SHEET_COLS, h // SHEET_ROWS
+    for i in range(SHEET_COLS * SHEET_ROWS):
+        r, c = divmod(i, SHEET_COLS)
+        yield c * cw, r * ch, cw, ch
+
+
+def svg_sheet(page):
+    """One tiled A4 page as SVG text (QR PNGs embedded as data URIs)."""
+    w, h = PAGE_SIZE
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="210mm" height="297mm" viewBox="0 0 {w} {h}">',
+           '<rect width="100%" height="100%" fill="white"/>']
+    for (entry, png), (x, y, cw, ch) in zip(page, _cells()):
+        side = min(cw, ch) - 90
+        ssid = (entry['ssid'].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;"))
+        out.append(f'<image x="{x + (cw - side) // 2}" y="{y + 20}" width="{side}" height="{side}" '
+                   f'href="data:image/png;base64,{base64.b64encode(png).decode()}"/>')
+        out.append(f'<text x="{x + cw // 2}" y="{y + side + 55}" font-family="sans-serif" font-size="26" '
+                   f'text-anchor="middle">{ssid}</text>')
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+def _label_font():
+    try:
+        return ImageFont.load_default(size=26)
+    except TypeError:                 # Pillow < 10.1 has a single bitmap size
+        return ImageFont.load_default()
+
+
+def pdf_page(page):
+    """One tiled A4 page as a 1-bit PIL image."""
+    sheet = Image.new("1", PAGE_SIZE, 1)
+    draw  = ImageDraw.Draw(sheet)
+    font  = _label_font()
+    for (entry, png), (x, y, cw, ch) in zip(page, _cells()):
+        side = min(cw, ch) - 90
+        qr   = Image.open(BytesIO(png)).convert("1").resize((side, side), Image.NEAREST)
+        sheet.paste(qr, (x + (cw - side) // 2, y + 20))
+        label = entry['ssid']
+        tw    = draw.textlength(label, font=font)
+        draw.text((x + (cw - tw) / 2, y + side + 35), label, fill=0, font=font)
+    return sheet
+
+
+def export_zip(entries, fp, cache=None, sheets=True):
+    """
+    Stream a ZIP of one PNG per network (plus tiled SVG sheets) into `fp`,
+    a path or a writable binary file.  Only one page of codes is held in
+    memory at any time.
+    """
+    seen = set()
+    with zipfile.ZipFile(fp, "w", zipfile.ZIP_STORED) as zf:
+        for n, page in enumerate(_pages(entries, cache), 1):
+            for entry, png in page:
+                zf.writestr(f"png/{_safe_name(entry['ssid'], seen)}.png", png)
+            if sheets:
+                zf.writestr(f"sheets/sheet-{n:03d}.svg", svg_sheet(page),
+                            compress_type=zipfile.ZIP_DEFLATED)
+    return len(seen)
+
+
+def export_pdf(entries, path, cache=None):
+    """Write a tiled multi-page PDF to `path`, appending one page at a time."""
+    pages = 0
+    for page in _pages(entries, cache):
+        pdf_page(page).save(path, "PDF", resolution=150, append=pages > 0)
+        pages += 1
+    return pages
@@ -0,0 +1,219 @@
+"""
+Saved-network parsers, per-OS collectors and an incremental, in-memory index.
+
+The parsers turn raw NetworkManager keyfiles / netsh / `security` output
+into plain values and never touch the system.  The collectors take a
+`run(args, timeout) -> str` callable, so recorded command output can be
+replayed through them on any OS.  SavedNetworkIndex remembers every parsed
+entry together with a change stamp (file mtime/inode/size, or keychain
+modification date), only re-reads the entries whose stamp moved, and does
+those re-reads on a bounded thread pool.
+"""
+import contextvars
+import glob
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from functools import partial
+
+NM_CONNECTIONS_GLOB = '/etc/NetworkManager/system-connections/*'
+WLAN_PROFILES_GLOB  = r'C:\ProgramData\Microsoft\Wlansvc\Profiles\Interfaces\*\*.xml'
+
+# ─────────────────────────────────────────────────────────────
+# PARSERS
+# ─────────────────────────────────────────────────────────────
+_NM_ID_RE    = re.compile(r'id=(.+)')
+_NM_PSK_RE   = re.compile(r'psk=(.+)')
+_NETSH_KV_RE = re.compile(r'(?m)^[^:\r\n]+:[ \t]+(\S.*?)\s*$')   # one 'label : value' per line
+_NETSH_KEY_RE = re.compile(r'Key (?:Content|Material)\s*:[ \t]*(.+)')   # English netsh prints "Key Content"
+_XML_NAME_RE = re.compile(r'<name>(.*?)</name>', re.S)
+_KC_SVCE_RE  = re.compile(r'"svce"<blob>="(.+?)"')
+_KC_MDAT_RE  = re.compile(r'"mdat"<timedate>=\S*\s*"(\d{14})')
+
+
+def parse_nm_keyfile(content, fallback_name=''):
+    """NetworkManager keyfile text → {'ssid', 'password'}."""
+    sm = _NM_ID_RE.search(content)
+    pm = _NM_PSK_RE.search(content)
+    return {'ssid': sm.group(1).strip() if sm else fallback_name,
+            'password': pm.group(1).strip() if pm else ''}
+
+
+def parse_netsh_profiles(out):
+    """`netsh wlan show profiles` → list of profile names."""
+    return [p.strip() for p in _NETSH_KV_RE.findall(out) if p.strip()]
+
+
+def parse_netsh_key(detail):
+    """`netsh wlan show profile <name> key=clear` → password ('' if none)."""
+    m = _NETSH_KEY_RE.search(detail)
+    return m.group(1).strip() if m else ''
+
+
+def parse_profile_xml_name(xml):
+    m = _XML_NAME_RE.search(xml)
+    return m.group(1).strip() if m else None
+
+
+def parse_keychain_listing(out):
+    """
+    `security find-generic-password -t 'AirPort Network' -g` (or dump-keychain)
+    → [(ssid, mdat or None)], in listing order.  Items are split on the
+    `keychain:` line that starts every record.
+    """
+    items = []
+    for block in re.split(r'(?m)^keychain:', out):
+        for ssid in _KC_SVCE_RE.findall(block):
+            m = _KC_MDAT_RE.search(block)
+            items.append((ssid, m.group(1) if m else None))
+    return items
+
+# ─────────────────────────────────────────────────────────────
+# CHANGE STAMPS
+# ─────────────────────────────────────────────────────────────
+def file_stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_ino, st.st_size]
+
+
+def nm_keyfile_stamps(pattern=NM_CONNECTIONS_GLOB):
+    """{path: stamp} for every NetworkManager keyfile – one stat() each, no reads."""
+    stamps = {}
+    for fp in sorted(glob.glob(pattern)):
+        try:
+            stamps[fp] = file_stamp(fp)
+        except OSError:
+            pass
+    return stamps
+
+
+def wlan_profile_stamps(pattern=WLAN_PROFILES_GLOB):
+    """{profile name: stamp} from the Wlansvc profile XML files (Windows)."""
+    stamps = {}
+    for fp in glob.glob(pattern):
+        try:
+            with open(fp, encoding='utf-8', errors='ignore') as f:
+                name = parse_profile_xml_name(f.read(4096))
+            if name:
+                stamps[name] = file_stamp(fp)
+        except OSError:
+            pass
+    return stamps
+
+# ─────────────────────────────────────────────────────────────
+# COLLECTORS  – (key, stamp, loader) triples per OS
+# ─────────────────────────────────────────────────────────────
+def run_command(args, timeout):
+    return subprocess.check_output(args, timeout=timeout, stderr=subprocess.STDOUT).decode('utf-8', errors='ignore')
+
+
+def _netsh_entry(run, profile):
+    try:
+        return {'ssid': profile,
+                'password': parse_netsh_key(run(['netsh','wlan','show','profile',profile,'key=clear'], 5))}
+    except Exception:
+        return {'ssid': profile, 'password': ''}
+
+
+def _keychain_entry(run, ssid):
+    try:
+        return {'ssid': ssid,
+                'password': run(['security','find-generic-password','-t','AirPort Network','-s',ssid,'-w'], 5).strip()}
+    except Exception:
+        return {'ssid': ssid, 'password': ''}
+
+
+def _nm_entry(fp):
+    with open(fp) as f:
+        return parse_nm_keyfile(f.read(), os.path.basename(fp))
+
+
+def windows_items(run=run_command, stamps=None):
+    out    = run(['netsh','wlan','show','profiles'], 10)
+    stamps = wlan_profile_stamps() if stamps is None else stamps
+    return [(f"netsh:{p}", stamps.get(p), partial(_netsh_entry, run, p)) for p in parse_netsh_profiles(out)]
+
+
+def macos_items(run=run_command):
+    out = run(['security','find-generic-password','-t','AirPort Network','-g'], 10)
+    return [(f"kc:{ssid}", mdat, partial(_keychain_entry, run, ssid)) for ssid, mdat in parse_keychain_listing(out)]
+
+
+def linux_items(pattern=NM_CONNECTIONS_GLOB):
+    return [(f"nm:{fp}", stamp, partial(_nm_entry, fp)) for fp, stamp in nm_keyfile_stamps(pattern).items()]
+
+# ─────────────────────────────────────────────────────────────
+# INDEX
+# ─────────────────────────────────────────────────────────────
+class SavedNetworkIndex:
+    """
+    key → {'stamp', 'ssid', 'password'}, kept in memory only – passwords
+    never reach the disk, so the first refresh in a process reads every
+    profile.
+
+    refresh_iter() takes (key, stamp, loader) triples; an entry is reused
+    while its stamp is unchanged, otherwise loader() is called for a fresh
+    {'ssid', 'password'}; a loader that raises skips its entry.  A stamp of
+    None always reloads.  Keys missing from the triples are dropped.
+    """
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self.entries = {}
+
+    @staticmethod
+    def _current(e, stamp):
+        return e is not None and stamp is not None and e['stamp'] == stamp
+
+    def store(self, key, stamp, entry):
+        with self._lock:
+            self.entries[key] = {'stamp': stamp, 'ssid': entry['ssid'], 'password': entry['password']}
+
+    def refresh_iter(self, items, max_workers=8, deadline=None, stats=None):
+        """
+        Yield {'ssid', 'password'} as entries become available: unchanged ones
+        straight from the index, changed ones as their loaders finish on a
+        pool of `max_workers` threads.  Loaders still running after
+        `deadline` seconds are abandoned (retried on the next refresh).
+
+        `stats`, if given, is a dict filled with this call's 'hits',
+        'misses' and 'timed_out' – concurrent refreshes never share counters.
+        """
+        items   = list(items)
+        seen    = {key for key, _, _ in items}
+        pending = {}
+        stats   = {} if stats is None else stats
+        stats.update(hits=0, misses=0, timed_out=0)
+        with self._lock:
+            entries = dict(self.entries)      # another refresh may prune self.entries meanwhile
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="saved-net")
+        try:
+            for key, stamp, loader in items:
+                e = entries.get(key)
+                if self._current(e, stamp):
+                    stats['hits'] += 1
+                    yield {'ssid': e['ssid'], 'password': e['password']}
+                else:
+                    stats['misses'] += 1
+                    pending[pool.submit(contextvars.copy_context().run, loader)] = (key, stamp)
+            try:
+                for fut in as_completed(pending, timeout=deadline):
+                    try:
+                        entry = fut.result()
+                    except Exception:
+                        continue      # unreadable entry – skip it, as a full scan would
+                    self.store(*pending[fut], entry)
+                    yield {'ssid': entry['ssid'], 'password': entry['password']}
+            except TimeoutError:
+                stats['timed_out'] = sum(not f.done() for f in pending)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            with self._lock:
+                for k in [k for k in self.entries if k not in seen]:
+                    del self.entries[k]
+
+    def refresh(self, items, max_workers=8, deadline=None, stats=None):
+        """List form of refresh_iter()."""
+        return list(self.refresh_iter(items, max_workers, deadline, stats))
@@ -0,0 +1,222 @@
+"""
+Compact per-BSSID scan records.
+
+A scan used to be a list of free-form dicts collapsed to one per SSID, so
+every AP of a mesh but the strongest was lost.  Network keeps one access
+point in a __slots__ object – ~96 bytes against ~270 for the same dict,
+with interned strings and plain ints – and ScanResult keys them by BSSID
+with an SSID → BSSIDs index so the UI can show one row per SSID and
+expand it to its APs.
+
+Network still answers n.get('signal') / n['ssid'], so code written against
+the old dicts (change_rate, network_key, ...) keeps working unchanged.
+"""
+import sys
+
+_intern = sys.intern
+
+
+class Network:
+    """One access point as seen by one scan."""
+
+    __slots__ = ('bssid', 'ssid', 'signal', 'security', 'channel', 'freq', 'rate', 'mode')
+
+    def __init__(self, bssid, ssid, signal=0, security='Unknown', channel='N/A', freq=0, rate=0, mode=''):
+        self.bssid    = _intern(bssid)
+        self.ssid     = _intern(ssid)
+        self.signal   = signal
+        self.security = _intern(security)
+        self.channel  = _intern(channel)
+        self.freq     = freq
+        self.rate     = rate
+        self.mode     = _intern(mode)
+
+    @classmethod
+    def from_dict(cls, d):
+        """Backend dict → Network.  `rate` may be '130 Mbit/s' or a number."""
+        rate = d.get('rate') or 0
+        if isinstance(rate, str):
+            rate = int(float(rate.split()[0])) if rate[:1].isdigit() else 0
+        return cls((d.get('bssid') or '').lower(), d.get('ssid') or 'Hidden', int(d.get('signal') or 0),
+                   d.get('security') or 'Unknown', str(d.get('channel') or 'N/A'),
+                   int(d.get('freq') or 0), rate, d.get('mode') or '')
+
+    # ── dict compatibility ──
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def astuple(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, Network) and self.astuple() == other.astuple()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Network({self.bssid or '-'} {self.ssid!r} {self.signal}%)"
+
+
+class ScanResult:
+    """
+    BSSID → Network plus an SSID → [BSSID] index, strongest AP first.
+
+    Records without a BSSID (backends that cannot report one) are keyed by
+    SSID, so they still show up once.  Iterating yields every record,
+    grouped by SSID, strongest SSID first.
+    """
+
+    __slots__ = ('records', 'by_ssid')
+
+    def __init__(self, networks=()):
+        self.records = {}
+        for n in networks:
+            if not isinstance(n, Network):
+                n = Network.from_dict(n)
+            key = n.bssid or n.ssid
+            old = self.records.get(key)
+            if old is None or n.signal > old.signal:
+                self.records[key] = n
+        self.by_ssid = {}
+        for key, n in sorted(self.records.items(), key=lambda kv: -kv[1].signal):
+            self.by_ssid.setdefault(n.ssid, []).append(key)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return (self.records[k] for keys in self.by_ssid.values() for k in keys)
+
+    def __eq__(self, other):
+        return isinstance(other, ScanResult) and self.records == other.records
+
+    __hash__ = None
+
+    @property
+    def ssid_count(self):
+        return len(self.by_ssid)
+
+    def aps(self, ssid):
+        """Every AP broadcasting `ssid`, strongest first."""
+        return [self.records[k] for k in self.by_ssid.get(ssid, ())]
+
+    def groups(self):
+        """[(ssid, [Network, ...])] – one entry per SSID, strongest SSID first."""
+        return [(ssid, [self.records[k] for k in keys]) for ssid, keys in self.by_ssid.items()]
+
+
+# ─────────────────────────────────────────────────────────────
+# DIFFING
+# ─────────────────────────────────────────────────────────────
+DIFF_FIELDS = ('security', 'channel')
+_UNFILLED   = {'', 'Unknown', 'N/A'}    # a backend that cannot report the field – never a change
+
+
+def _field_changed(o, n):
+    for f in DIFF_FIELDS:
+        a, b = getattr(o, f), getattr(n, f)
+        if a != b and a not in _UNFILLED and b not in _UNFILLED:
+            return True
+    return False
+
+
+def _group_changed(old, new, threshold):
+    if len(old) != len(new):
+        return True
+    before = {n.bssid or n.ssid: n for n in old}
+    for n in new:
+        o = before.get(n.bssid or n.ssid)
+        if o is None or abs(n.signal - o.signal) >= threshold or _field_changed(o, n):
+            return True
+    return False
+
+
+def diff_scans(previous, current, threshold=10):
+    """
+    Classify every SSID of two ScanResults: {'added', 'removed', 'changed'}
+    (lists of SSIDs) and 'unchanged' (a count).  A network changed when an
+    AP appeared or went, moved its signal by ≥ `threshold` points, or
+    changed security / channel; smaller signal jitter is ignored, and so is
+    a field one side left unfilled (rate and mode are never compared).
+    """
+    prev = previous.by_ssid if previous is not None else {}
+    cur  = current.by_ssid if current is not None else {}
+    added   = [s for s in cur if s not in prev]
+    removed = [s for s in prev if s not in cur]
+    changed = [s for s in cur if s in prev and _group_changed(previous.aps(s), current.aps(s), threshold)]
+    return {'added': added, 'removed': removed, 'changed': changed,
+            'unchanged': len(cur) - len(added) - len(changed)}
+
+
+def apply_diff(previous, current, diff):
+    """
+    The result to display: records of added / changed SSIDs from `current`,
+    everything else exactly as it was in `previous`, so rows whose change
+    stayed under the threshold render identically.
+    """
+    if previous is None:
+        return current
+    fresh = set(diff['added']) | set(diff['changed'])
+    return ScanResult([n for n in current if n.ssid in fresh] +
+                      [n for n in previous if n.ssid not in fresh and n.ssid in current.by_ssid])
+
+
+def is_empty(diff):
+    return not (diff['added'] or diff['removed'] or diff['changed'])
+
+
+# ─────────────────────────────────────────────────────────────
+# TABLE VIEW
+# ─────────────────────────────────────────────────────────────
+def band(freq):
+    if 2400 <= freq < 2500:
+        return "2.4 GHz"
+    if 4900 <= freq < 5925:
+        return "5 GHz"
+    if 5925 <= freq <= 7125:
+        return "6 GHz"
+    return ""
+
+
+TABLE_SORTS = {
+    'Signal':  lambda r: r['signal'],
+    'SSID':    lambda r: r['ssid'].lower(),
+    'Channel': lambda r: int(r['channel']) if r['channel'].isdigit() else 0,
+    'APs':     lambda r: r['aps'],
+}
+
+
+def table_rows(result, query="", security=None, sort='Signal', descending=True):
+    """
+    One flat row per SSID (its strongest AP) for a data grid, filtered by
+    SSID substring and security ("open" / "secured" / None for both) and
+    sorted across the whole result, not just one page.
+    """
+    q = query.strip().lower()
+    rows = []
+    for ssid, aps in result.groups() if result else ():
+        if q and q not in ssid.lower():
+            continue
+        n = aps[0]
+        is_open = "Open" in n.security
+        if security is not None and (security == "open") != is_open:
+            continue
+        rows.append({'ssid': ssid, 'signal': n.signal, 'aps': len(aps), 'security': n.security,
+                     'channel': n.channel, 'band': band(n.freq), 'bssid': n.bssid})
+    rows.sort(key=TABLE_SORTS[sort], reverse=descending)
+    return rows
+
+
+def paginate(rows, page, page_size):
+    """(rows on `page`, clamped page number, page count) – pages are 1-based."""
+    pages = max(1, -(-len(rows) // page_size))
+    page  = min(max(1, int(page)), pages)
+    return rows[(page - 1) * page_size:page * page_size], page, pages
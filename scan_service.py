@@ -0,0 +1,687 @@
+"""
+Background scanning and shared caches for WiFi Manager Pro.
+
+Nothing in here imports Streamlit – app.py wires these objects into a
+process-wide resource (st.cache_resource) so every session reads the same
+cached results instead of shelling out on each rerun.
+"""
+import contextvars
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ─────────────────────────────────────────────────────────────
+# TTL CACHE
+# ─────────────────────────────────────────────────────────────
+class TTLCache:
+    """Thread-safe key → value store where entries go stale after `ttl` seconds."""
+
+    def __init__(self, ttl=15.0):
+        self.ttl    = float(ttl)
+        self._lock  = threading.Lock()
+        self._items = {}              # key → (value, stored_at)
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic())
+
+    def peek(self, key):
+        """Return (value, age_seconds) regardless of freshness, or (None, None)."""
+        with self._lock:
+            item = self._items.get(key)
+        if item is None:
+            return None, None
+        return item[0], time.monotonic() - item[1]
+
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+# ─────────────────────────────────────────────────────────────
+# DISK CACHE
+# ─────────────────────────────────────────────────────────────
+class DiskCache:
+    """Small JSON-file key → value store that survives restarts."""
+
+    def __init__(self, path):
+        self.path  = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load().get(key, default)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._data, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()[key] = value
+            self._save()
+
+# ─────────────────────────────────────────────────────────────
+# SINGLE-FLIGHT
+# ─────────────────────────────────────────────────────────────
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done   = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs `fn`; everyone arriving while it is in
+    flight waits and receives the same result (or exception).  Per-key
+    counters record how many calls were made, executed and coalesced.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._flights = {}
+        self._stats   = {}            # key → {'calls', 'executions', 'coalesced'}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            stats = self._stats.setdefault(key, {'calls': 0, 'executions': 0, 'coalesced': 0})
+            stats['calls'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                stats['executions'] += 1
+            else:
+                stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def counters(self):
+        """Return a copy of the per-key counters."""
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+# ─────────────────────────────────────────────────────────────
+# PROBE BOARD (status-bar probes)
+# ─────────────────────────────────────────────────────────────
+class ProbeBoard:
+    """
+    Named probes with their own TTL, refreshed concurrently when stale.
+
+    read() returns {name: (value, age_seconds)}.  Fresh values come straight
+    from the cache; stale ones are re-run in parallel on a small thread pool
+    (through `flights` when given, so sessions share one execution).
+    """
+
+    def __init__(self, flights=None, max_workers=4):
+        self.flights = flights
+        self.cache   = TTLCache()
+        self._probes = {}             # name → (fn, ttl)
+        self._pool   = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+
+    def register(self, name, fn, ttl):
+        self._probes[name] = (fn, float(ttl))
+        return self
+
+    def _run(self, name):
+        fn, _ = self._probes[name]
+        value = self.flights.do(name, fn) if self.flights else fn()
+        self.cache.set(name, value)
+        return value
+
+    def stale(self, name):
+        _, age = self.cache.peek(name)
+        return age is None or age > self._probes[name][1]
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.cache.clear()
+        else:
+            self.cache.discard(name)
+
+    def read(self, names=None):
+        names   = list(names or self._probes)
+        pending = {n: self._pool.submit(contextvars.copy_context().run, self._run, n)   # caller's tracing span
+                   for n in names if self.stale(n)}
+        for n, fut in pending.items():
+            try:
+                fut.result()
+            except Exception:
+                pass                  # keep the previous value, if any
+        return {n: self.cache.peek(n) for n in names}
+
+# ─────────────────────────────────────────────────────────────
+# BACKGROUND JOBS  (long-running tasks with progress + cancel)
+# ─────────────────────────────────────────────────────────────
+class JobCancelled(Exception):
+    """Raised inside a job function when its handle has been cancelled."""
+
+
+class Job:
+    """
+    Handle for one background run.  The job function receives the handle
+    and reports through update(phase, progress, **live); it should call
+    check() between steps so cancel() takes effect promptly.
+    """
+
+    def __init__(self, name):
+        self.name     = name
+        self.phase    = "queued"
+        self.progress = 0.0
+        self.live     = {}
+        self.result   = None
+        self.error    = None
+        self.started  = time.time()
+        self.finished = None
+        self._cancel  = threading.Event()
+        self._lock    = threading.Lock()
+
+    def update(self, phase=None, progress=None, **live):
+        with self._lock:
+            if phase is not None:
+                self.phase = phase
+            if progress is not None:
+                self.progress = max(0.0, min(1.0, float(progress)))
+            self.live.update(live)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    def snapshot(self):
+        """Consistent copy of the progress fields for rendering."""
+        with self._lock:
+            return {'phase': self.phase, 'progress': self.progress, 'live': dict(self.live),
+                    'elapsed': self.elapsed, 'done': self.done}
+
+
+class JobRunner:
+    """
+    At most one running job per name, shared by every caller.
+
+    submit() while a job of that name is running returns the running
+    handle instead of starting another; latest() returns the running job,
+    else the last finished one, and last_result() the last one that
+    produced something – so every session sees the same progress and the
+    same result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}               # name → latest Job
+        self._done = {}               # name → last job that finished with a result
+
+    def submit(self, name, fn, *args, **kwargs):
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is not None and not job.done:
+                return job
+            job = self._jobs[name] = Job(name)
+        threading.Thread(target=self._run, args=(job, fn, args, kwargs),
+                         name=f"job-{name}", daemon=True).start()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.update(phase="cancelled" if job.cancelled else "done", progress=1.0)
+        except JobCancelled:
+            job.update(phase="cancelled")
+        except Exception as e:
+            job.error = str(e) or e.__class__.__name__
+            job.update(phase="failed")
+        finally:
+            job.finished = time.time()
+            if job.result is not None:
+                self._done[job.name] = job
+
+    def latest(self, name):
+        with self._lock:
+            return self._jobs.get(name)
+
+    def last_result(self, name):
+        """The most recent finished job of `name` that produced a result, or None."""
+        with self._lock:
+            return self._done.get(name)
+
+    def running(self, name):
+        job = self.latest(name)
+        return job is not None and not job.done
+
+# ─────────────────────────────────────────────────────────────
+# ADAPTIVE RESCAN SCHEDULE
+# ─────────────────────────────────────────────────────────────
+def network_key(n):
+    return n.get('bssid') or n.get('ssid')
+
+
+def change_rate(previous, current, signal_delta=10):
+    """
+    Fraction of networks (over the union of both scans) that appeared,
+    disappeared or moved their signal by at least `signal_delta` points.
+    """
+    prev = {network_key(n): n.get('signal', 0) for n in previous or []}
+    cur  = {network_key(n): n.get('signal', 0) for n in current or []}
+    keys = prev.keys() | cur.keys()
+    if not keys:
+        return 0.0
+    changed = sum(1 for k in keys
+                  if k not in prev or k not in cur or abs(cur[k] - prev[k]) >= signal_delta)
+    return changed / len(keys)
+
+
+class AdaptiveSchedule:
+    """
+    Pick the next active-rescan interval from how much the last scan changed.
+
+    A quiet scan (change rate ≤ `stable`) multiplies the interval by
+    `backoff`; a busy one (≥ `busy`) multiplies it by `speedup`; anything in
+    between keeps it.  The result is clamped to [min_interval, max_interval].
+    Every decision is kept (bounded) together with the scan's cost.
+    """
+
+    def __init__(self, min_interval=10.0, max_interval=300.0, backoff=1.5, speedup=0.5,
+                 stable=0.05, busy=0.25, signal_delta=10, history=100):
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.backoff, self.speedup = backoff, speedup
+        self.stable,  self.busy    = stable, busy
+        self.signal_delta = signal_delta
+        self.interval  = self.min_interval
+        self.decisions = deque(maxlen=history)
+
+    def set_min_interval(self, seconds):
+        self.min_interval = max(1.0, float(seconds))
+        self.max_interval = max(self.max_interval, self.min_interval)
+        self.interval     = min(max(self.interval, self.min_interval), self.max_interval)
+
+    def observe(self, previous, current, cost):
+        """Record one scan and return the interval until the next one."""
+        rate = change_rate(previous, current, self.signal_delta) if previous is not None else 1.0
+        if rate <= self.stable:
+            decision, factor = "back off", self.backoff
+        elif rate >= self.busy:
+            decision, factor = "speed up", self.speedup
+        else:
+            decision, factor = "hold", 1.0
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval * factor))
+        self.decisions.append({'time': time.time(), 'cost': round(cost, 3), 'change': round(rate, 3),
+                               'decision': decision, 'interval': round(self.interval, 1)})
+        return self.interval
+
+    def metrics(self):
+        costs = [d['cost'] for d in self.decisions]
+        return {
+            'interval':  round(self.interval, 1),
+            'scans':     len(costs),
+            'avg_cost':  round(sum(costs) / len(costs), 3) if costs else None,
+            'last_cost': costs[-1] if costs else None,
+            'last_change': self.decisions[-1]['change'] if self.decisions else None,
+        }
+
+# ─────────────────────────────────────────────────────────────
+# BACKGROUND SCANNER
+# ─────────────────────────────────────────────────────────────
+class BackgroundScanner:
+    """
+    Long-lived daemon thread that keeps the latest WiFi scan in a TTLCache.
+
+    `scan_fn` is any zero-argument callable returning a list of network dicts;
+    it may raise – the error is kept in `last_error` and the previous result
+    stays in the cache.  Readers call snapshot() and never block; `version`
+    only moves when a scan returns a different result.
+
+    With an AdaptiveSchedule attached (set_schedule) the rescan interval
+    follows the observed rate of change instead of the TTL.  In event-driven
+    mode (set_event_driven) something else – NMEventMonitor – calls
+    scan_once() when the air changes, and the worker falls back to a slow
+    safety-net interval.
+
+    With `idle_after` set, the worker stops rescanning once nobody has read
+    the cache (snapshot / touch) for that many seconds, and resumes on the
+    next read.
+    """
+
+    KEY = "networks"
+
+    def __init__(self, scan_fn, ttl=15.0, idle_after=None):
+        self.scan_fn     = scan_fn
+        self.cache       = TTLCache(ttl)
+        self.idle_after  = idle_after
+        self.last_read   = time.monotonic()
+        self.last_error  = None
+        self.version     = 0
+        self.event_driven = False
+        self.fallback_interval = None
+        self.schedule    = None
+        self.listeners   = []
+        self._scan_lock = threading.Lock()
+        self._wake     = threading.Event()
+        self._stop     = threading.Event()
+        self._scanning = threading.Event()
+        self._forced   = False
+        self._thread   = None
+        self._lock     = threading.Lock()
+
+    # ── lifecycle ──
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="wifi-scanner", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # ── control ──
+    @property
+    def ttl(self):
+        return self.cache.ttl
+
+    def set_ttl(self, ttl):
+        ttl = max(1.0, float(ttl))
+        if ttl != self.cache.ttl:
+            self.cache.ttl = ttl
+            self._wake.set()          # re-evaluate the sleep, no forced scan
+
+    def request_scan(self):
+        """Ask for a rescan as soon as possible; returns immediately."""
+        self._forced = True
+        self._wake.set()
+
+    def set_event_driven(self, enabled, fallback_interval=300.0):
+        """In event mode the worker only rescans every `fallback_interval` s."""
+        self.event_driven      = bool(enabled)
+        self.fallback_interval = float(fallback_interval) if enabled else None
+        self._wake.set()
+
+    def set_schedule(self, schedule):
+        """Attach an AdaptiveSchedule (or None for plain TTL-driven rescans)."""
+        if schedule is not self.schedule:
+            self.schedule = schedule
+            self._wake.set()
+
+    def add_listener(self, fn):
+        """Call fn(result) after every successful scan, active or passive."""
+        if fn not in self.listeners:
+            self.listeners.append(fn)
+
+    @property
+    def interval(self):
+        if self.fallback_interval:
+            return self.fallback_interval
+        return self.schedule.interval if self.schedule else self.cache.ttl
+
+    @property
+    def scanning(self):
+        return self._scanning.is_set()
+
+    @property
+    def idle(self):
+        """No reader within `idle_after` seconds – the worker is parked."""
+        return bool(self.idle_after) and time.monotonic() - self.last_read > self.idle_after
+
+    # ── reading ──
+    def touch(self):
+        """Note that someone is watching; wakes a parked worker."""
+        if self.idle:
+            self._wake.set()
+        self.last_read = time.monotonic()
+
+    def snapshot(self):
+        """Return (networks or None, age_seconds or None) without blocking."""
+        self.touch()
+        return self.cache.peek(self.KEY)
+
+    def scan_once(self, fn=None):
+        """Run one scan (scan_fn, or `fn`) on the calling thread and store the result."""
+        with self._scan_lock:
+            self._scanning.set()
+            t0 = time.monotonic()
+            try:
+                result = (fn or self.scan_fn)()
+                previous, _ = self.cache.peek(self.KEY)
+                self.cache.set(self.KEY, result)
+                if self.schedule and fn is None:          # only active scans steer the schedule
+                    self.schedule.observe(previous, result, time.monotonic() - t0)
+                self.last_error = None
+                for listener in self.listeners:
+                    try:
+                        listener(result)
+                    except Exception:
+                        pass          # a broken consumer must not fail the scan
+                if result != previous:
+                    self.version += 1
+            except Exception as e:
+                self.last_error = str(e) or e.__class__.__name__
+            finally:
+                self._scanning.clear()
+        return self.cache.peek(self.KEY)[0]
+
+    # ── worker ──
+    def _run(self):
+        last_attempt = None
+        while not self._stop.is_set():
+            due = last_attempt is None or time.monotonic() - last_attempt >= self.interval
+            self._wake.clear()
+            if self._forced or (due and not self.idle):
+                self._forced = False
+                last_attempt = time.monotonic()
+                self.scan_once()
+            if self.idle:
+                self._wake.wait()         # no viewers – sleep until touch() / request_scan()
+            else:
+                self._wake.wait(max(0.5, self.interval - (time.monotonic() - last_attempt)))
+
+# ─────────────────────────────────────────────────────────────
+# NETWORKMANAGER EVENT MONITOR  (Linux, push-based updates)
+# ─────────────────────────────────────────────────────────────
+class NMEventMonitor:
+    """
+    Follow NetworkManager's change stream with one long-lived subprocess and
+    call `on_change()` only when access points appear, disappear or move
+    their signal by at least `min_delta` percent.
+
+    The D-Bus stream (gdbus monitor) carries AccessPointAdded/Removed and
+    per-AP Strength changes; `nmcli monitor` is the fallback and only knows
+    about device/connection state.  `on_source(ap_events)` is told whenever
+    the stream starts, falls back, gives up or is stopped, so a scanner only
+    relies on events while they cover APs.  Bursts are coalesced: on_change() runs
+    once the stream has been quiet for `debounce` seconds (at most
+    `max_delay` after the first event).  While nothing happens both threads
+    sit in blocking calls – no polling, no spawns.
+    """
+
+    GDBUS = ['gdbus', 'monitor', '--system', '--dest', 'org.freedesktop.NetworkManager']
+    NMCLI = ['nmcli', 'monitor']
+
+    _AP_EVENT_RE = re.compile(r'AccessPoint(Added|Removed)')
+    _STRENGTH_RE = re.compile(r"^(\S+): .*PropertiesChanged .*'Strength': <byte (0x[0-9a-fA-F]+|\d+)>")
+
+    def __init__(self, on_change, commands=(GDBUS, NMCLI), debounce=2.0, max_delay=10.0, min_delta=5,
+                 on_source=None):
+        self.on_change = on_change
+        self.on_source = on_source
+        self.commands  = [list(c) for c in commands]
+        self.debounce  = debounce
+        self.max_delay = max_delay
+        self.min_delta = min_delta
+        self.command   = None         # the command actually running
+        self.events    = 0            # lines read
+        self.relevant  = 0            # lines that asked for a refresh
+        self.refreshes = 0            # on_change() calls
+        self.last_error = None
+        self.gave_up   = False        # every command failed to start or exited
+        self._strength = {}           # AP object path → last reported strength
+        self._proc  = None
+        self._kick  = threading.Event()
+        self._stop  = threading.Event()
+        self._threads = []
+
+    # ── lifecycle ──
+    def start(self):
+        if self.running:
+            return self
+        self._stop.clear()
+        self.gave_up = False
+        self._threads = [threading.Thread(target=self._read, name="nm-monitor", daemon=True),
+                         threading.Thread(target=self._flush, name="nm-flush", daemon=True)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._kick.set()
+        self.gave_up = False
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+        self._source(False)
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    @property
+    def ap_events(self):
+        """Does the running stream report access points (gdbus), not just device state (nmcli)?"""
+        return self.running and self.command is not None and self.command[0] != 'nmcli'
+
+    def _source(self, ap_events):
+        if self.on_source is not None:
+            try:
+                self.on_source(ap_events)
+            except Exception as e:
+                self.last_error = str(e)
+
+    # ── classification ──
+    def is_relevant(self, line):
+        """Does this monitor line describe an AP change worth a refresh?"""
+        if self.command and self.command[0] == 'nmcli':
+            return bool(line.strip())
+        if self._AP_EVENT_RE.search(line):
+            return True
+        m = self._STRENGTH_RE.search(line)
+        if m:
+            path, value = m.group(1), int(m.group(2), 0)
+            prev = self._strength.get(path)
+            self._strength[path] = value
+            return prev is None or abs(value - prev) >= self.min_delta
+        return False
+
+    def feed(self, line):
+        self.events += 1
+        if self.is_relevant(line):
+            self.relevant += 1
+            self._kick.set()
+
+    # ── threads ──
+    def _read(self):
+        for cmd in self.commands:
+            if self._stop.is_set():
+                return
+            try:
+                self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                              text=True, bufsize=1)
+            except OSError as e:
+                self.last_error = str(e)
+                continue
+            self.command = cmd
+            self._source(cmd[0] != 'nmcli')
+            for line in self._proc.stdout:
+                if self._stop.is_set():
+                    break
+                self.feed(line)
+            self._proc.wait()
+            if self._stop.is_set():
+                return
+            self.last_error = f"{cmd[0]} exited with {self._proc.returncode}"
+        if not self.commands:
+            self.last_error = "neither gdbus nor nmcli is installed"
+        self.gave_up = True
+        self._stop.set()
+        self._kick.set()
+        self._source(False)
+
+    def _flush(self):
+        while not self._stop.is_set():
+            self._kick.wait()
+            if self._stop.is_set():
+                return
+            self._kick.clear()
+            first = time.monotonic()
+            while self._kick.wait(self.debounce) and time.monotonic() - first < self.max_delay:
+                self._kick.clear()
+                if self._stop.is_set():
+                    return
+            self._kick.clear()
+            self.refreshes += 1
+            try:
+                self.on_change()
+            except Exception as e:
+                self.last_error = str(e)
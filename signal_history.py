@@ -0,0 +1,159 @@
+"""
+Fixed-memory signal history.
+
+SignalHistory is a ring buffer of (timestamp, BSSID, signal, channel)
+samples held in preallocated numpy arrays, so its size is set once at
+construction and never grows however long the monitor runs.  BSSIDs are
+stored as small integer ids; the id table is bounded too, and ids whose
+samples have all been overwritten are recycled.
+
+Appends are O(1) writes at the cursor.  Reads are vectorised: window()
+masks the buffer for one BSSID, summary() reduces every BSSID at once
+with bincount / ufunc.at instead of looping in Python.
+"""
+import threading
+import time
+
+import numpy as np
+
+_FREE = -1
+
+
+class SignalHistory:
+    """Ring buffer of scan samples with per-BSSID windows and stats for every BSSID."""
+
+    def __init__(self, capacity=50_000, max_keys=8192):
+        self.capacity = int(capacity)
+        self.max_keys = int(max_keys)
+        self.ts      = np.zeros(self.capacity, dtype=np.float64)
+        self.key     = np.full(self.capacity, _FREE, dtype=np.int32)
+        self.signal  = np.zeros(self.capacity, dtype=np.uint8)
+        self.channel = np.zeros(self.capacity, dtype=np.uint16)
+        self.pos     = 0
+        self.size    = 0
+        self.ids     = {}             # bssid → id
+        self.names   = {}             # id → bssid
+        self._free_ids = list(range(self.max_keys - 1, -1, -1))
+        self._lock   = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.key.nbytes + self.signal.nbytes + self.channel.nbytes
+
+    def __len__(self):
+        return self.size
+
+    # ── writing ──
+    def _id(self, bssid):
+        i = self.ids.get(bssid)
+        if i is not None:
+            return i
+        if not self._free_ids:
+            self._reclaim()
+        i = self._free_ids.pop()
+        self.ids[bssid] = i
+        self.names[i] = bssid
+        return i
+
+    def _reclaim(self):
+        """
+        Free ids with no samples left; if every id is live, evict the least
+        recently seen eighth of them at once so a churning site does not
+        pay for a full-buffer pass on every new BSSID.
+        """
+        valid = self.key != _FREE
+        live  = set(np.unique(self.key[valid]).tolist())
+        dead  = [i for i in self.names if i not in live]
+        if not dead:
+            last = np.full(self.max_keys, -np.inf)
+            np.maximum.at(last, self.key[valid], self.ts[valid])
+            dead = np.argsort(last, kind="stable")[:max(1, self.max_keys // 8)].tolist()
+            self.key[np.isin(self.key, dead)] = _FREE
+        for i in dead:
+            del self.ids[self.names.pop(i)]
+            self._free_ids.append(i)
+
+    def append(self, bssid, signal, channel=0, ts=None):
+        with self._lock:
+            p = self.pos
+            self.ts[p]      = time.time() if ts is None else ts
+            self.key[p]     = self._id(bssid)
+            self.signal[p]  = signal
+            self.channel[p] = channel
+            self.pos  = (p + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def record(self, networks, ts=None):
+        """Append one sample per AP of a scan (ScanResult or list of network dicts) in one write."""
+        rows = [(n.get('bssid') or n.get('ssid'), n.get('signal', 0), n.get('channel')) for n in networks or ()]
+        if not rows:
+            return
+        rows = rows[-self.capacity:]
+        with self._lock:
+            idx = (self.pos + np.arange(len(rows))) % self.capacity
+            self.ts[idx]      = time.time() if ts is None else ts
+            for j, (b, _, _) in enumerate(rows):          # one at a time: _reclaim() must see new ids as live
+                self.key[idx[j]] = self._id(b)
+            self.signal[idx]  = [s for _, s, _ in rows]
+            self.channel[idx] = [int(c) if str(c).isdigit() else 0 for _, _, c in rows]
+            self.pos  = int(idx[-1] + 1) % self.capacity
+            self.size = min(self.size + len(rows), self.capacity)
+
+    # ── reading ──
+    def _ordered(self):
+        """Index array of live slots, oldest first."""
+        if self.size < self.capacity:
+            return np.arange(self.size)
+        return np.roll(np.arange(self.capacity), -self.pos)
+
+    def window(self, bssid, seconds=None, now=None):
+        """(timestamps, signals) for one BSSID, oldest first, optionally the last `seconds` only."""
+        with self._lock:
+            i = self.ids.get(bssid)
+            if i is None:
+                return np.empty(0), np.empty(0, dtype=np.uint8)
+            idx  = self._ordered()
+            mask = self.key[idx] == i
+            if seconds is not None:
+                mask &= self.ts[idx] >= (time.time() if now is None else now) - seconds
+            sel = idx[mask]
+            return self.ts[sel].copy(), self.signal[sel].copy()
+
+    def summary(self, seconds=None, now=None):
+        """
+        {bssid: {'n', 'min', 'avg', 'max', 'trend'}} for every BSSID in one
+        vectorised pass; trend in %/min (least squares).
+        """
+        with self._lock:
+            valid = self.key[:self.size] != _FREE       # slots [0, size) are the written ones
+            k = self.key[:self.size][valid]
+            t = self.ts[:self.size][valid]
+            s = self.signal[:self.size][valid].astype(np.float64)
+            names = dict(self.names)
+        if seconds is not None:
+            keep = t >= (time.time() if now is None else now) - seconds
+            k, t, s = k[keep], t[keep], s[keep]
+        if not len(k):
+            return {}
+        m   = self.max_keys
+        n   = np.bincount(k, minlength=m).astype(np.float64)
+        lo  = np.full(m, np.inf);  np.minimum.at(lo, k, s)
+        hi  = np.full(m, -np.inf); np.maximum.at(hi, k, s)
+        sx  = np.bincount(k, t - t.min(), m)
+        sy  = np.bincount(k, s, m)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mx, my = sx / n, sy / n
+            dx  = (t - t.min()) - mx[k]
+            cov = np.bincount(k, dx * (s - my[k]), m)
+            var = np.bincount(k, dx * dx, m)
+            slope = np.where(var > 0, cov / var, 0.0) * 60
+        return {names[i]: {'n': int(n[i]), 'min': int(lo[i]), 'avg': round(float(my[i]), 1),
+                           'max': int(hi[i]), 'trend': round(float(slope[i]), 2)}
+                for i in np.flatnonzero(n) if i in names}
+
+    def clear(self):
+        with self._lock:
+            self.key[:] = _FREE
+            self.pos = self.size = 0
+            self.ids.clear(); self.names.clear()
+            self._free_ids = list(range(self.max_keys - 1, -1, -1))
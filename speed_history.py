@@ -0,0 +1,146 @@
+"""
+Persistent speed-test history in SQLite (WAL mode).
+
+Every result is appended as a raw row and folded, in the same
+transaction, into hour / day rollups (count, sum, min, max per metric).
+A metric the result lacks is stored as NULL and left out of its
+rollup, so it never drags an average down.  Charts pick the coarsest
+grain that still gives enough points for the requested span, so months
+of history come from a few hundred rollup rows instead of every raw
+sample.  prune() drops raw rows and hour rollups past their retention;
+day rollups are kept forever.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+METRICS = ("download", "upload", "ping")
+GRAINS  = {"hour": 3600, "day": 86400}      # raw rows already cover every span a minute grain would
+RETENTION = {                     # seconds each level is kept for
+    "raw":    7 * 86400,
+    "hour":   400 * 86400,
+}
+PRUNE_EVERY = 3600                # at most one prune pass per hour of appends
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS samples (
+    ts REAL NOT NULL, download REAL, upload REAL, ping REAL, jitter REAL, loss REAL,
+    server TEXT, source TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples(ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    grain TEXT NOT NULL, bucket INTEGER NOT NULL, n INTEGER NOT NULL,
+    {", ".join(f"{m}_n INTEGER NOT NULL, {m}_sum REAL, {m}_min REAL, {m}_max REAL" for m in METRICS)},
+    PRIMARY KEY (grain, bucket)
+) WITHOUT ROWID;
+"""
+
+# NULL-safe folds: coalesce(a op b, a, b) keeps whichever side is known
+_UPSERT = f"""
+INSERT INTO rollups (grain, bucket, n, {", ".join(f"{m}_n, {m}_sum, {m}_min, {m}_max" for m in METRICS)})
+VALUES (?, ?, 1, {", ".join("?, ?, ?, ?" for _ in METRICS)})
+ON CONFLICT (grain, bucket) DO UPDATE SET n = n + 1,
+    {", ".join(f"{m}_n = {m}_n + excluded.{m}_n, "
+               f"{m}_sum = coalesce({m}_sum + excluded.{m}_sum, {m}_sum, excluded.{m}_sum), "
+               f"{m}_min = coalesce(min({m}_min, excluded.{m}_min), {m}_min, excluded.{m}_min), "
+               f"{m}_max = coalesce(max({m}_max, excluded.{m}_max), {m}_max, excluded.{m}_max)" for m in METRICS)}
+"""
+
+
+class SpeedHistory:
+    """Append-only store of speed-test results with rollups and retention."""
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db   = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._last_prune = 0.0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ── writing ──
+    def append(self, result, ts=None):
+        """Store one run_okla_speedtest() result dict; missing metrics are stored as NULL."""
+        ts = time.time() if ts is None else ts
+        vals = [float(result[m]) if result.get(m) is not None else None for m in METRICS]
+        fold = [x for v in vals for x in (int(v is not None), v, v, v)]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (ts, *vals, result.get('jitter'), result.get('loss'),
+                                  result.get('server'), result.get('source')))
+                for grain, width in GRAINS.items():
+                    self._db.execute(_UPSERT, (grain, int(ts // width) * width, *fold))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if ts - self._last_prune >= PRUNE_EVERY:
+            self.prune(ts)
+
+    def prune(self, now=None):
+        """Drop raw rows and hour rollups older than RETENTION; returns rows deleted."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_prune = now
+            n  = self._db.execute("DELETE FROM samples WHERE ts < ?", (now - RETENTION["raw"],)).rowcount
+            for grain in ("hour",):
+                n += self._db.execute("DELETE FROM rollups WHERE grain = ? AND bucket < ?",
+                                      (grain, now - RETENTION[grain])).rowcount
+        return n
+
+    # ── reading ──
+    def latest(self):
+        """The newest raw result as a dict (with 'ts'), or None."""
+        with self._lock:
+            row = self._db.execute("SELECT ts, download, upload, ping, jitter, loss, server, source "
+                                   "FROM samples ORDER BY ts DESC LIMIT 1").fetchone()
+        if row is None:
+            return None
+        return dict(zip(("ts", "download", "upload", "ping", "jitter", "loss", "server", "source"), row))
+
+    def counts(self):
+        with self._lock:
+            raw = self._db.execute("SELECT count(*), min(ts) FROM samples").fetchone()
+            roll = dict(self._db.execute("SELECT grain, count(*) FROM rollups GROUP BY grain").fetchall())
+        return {'raw': raw[0], 'oldest': raw[1], **{g: roll.get(g, 0) for g in GRAINS}}
+
+    @staticmethod
+    def pick_grain(span, max_points=500):
+        """Finest level that keeps a `span`-second chart under `max_points` points."""
+        if span <= 6 * 3600 and span <= RETENTION["raw"]:
+            return "raw"
+        for grain, width in GRAINS.items():
+            if span / width <= max_points and (grain == "day" or span <= RETENTION[grain]):
+                return grain
+        return "day"
+
+    def series(self, since, until=None, grain=None):
+        """
+        [{'ts', 'download', 'upload', 'ping'} (+ '<metric>_min/_max' for
+        rollups)] between `since` and `until`, oldest first; a metric no
+        result in the bucket reported is None.  `grain` defaults to
+        pick_grain(until - since).
+        """
+        until = time.time() if until is None else until
+        grain = grain or self.pick_grain(until - since)
+        with self._lock:
+            if grain == "raw":
+                rows = self._db.execute("SELECT ts, download, upload, ping FROM samples "
+                                        "WHERE ts >= ? AND ts <= ? ORDER BY ts", (since, until)).fetchall()
+                return [dict(zip(("ts",) + METRICS, r)) for r in rows]
+            cols = ", ".join(f"{m}_sum / nullif({m}_n, 0), {m}_min, {m}_max" for m in METRICS)
+            rows = self._db.execute(f"SELECT bucket, {cols} FROM rollups WHERE grain = ? "
+                                    "AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+                                    (grain, int(since // GRAINS[grain]) * GRAINS[grain], until)).fetchall()
+        keys = ("ts",) + tuple(k for m in METRICS for k in (m, f"{m}_min", f"{m}_max"))
+        return [dict(zip(keys, r)) for r in rows]
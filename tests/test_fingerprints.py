@@ -0,0 +1,52 @@
+"""
+Fingerprint index: model derivation from first-word matches and identify().
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fingerprints import FingerprintIndex, derive_model, favicon_hash
+
+
+@pytest.fixture
+def index():
+    return FingerprintIndex.default(user_path=os.devnull)
+
+# ─────────────────────────────────────────────────────────────
+# derive_model
+# ─────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("rest, model", [
+    ("Wireless N Router WR841N",                            "WR841N"),
+    ("E1200/1.0.04",                                        "E1200"),
+    ("AC1750 Wireless Dual Band Gigabit Router Archer C7",  "Archer C7"),
+    ("Router Login - DIR-615",                              "DIR-615"),
+    ("| Login",                                             None),
+    ("Wireless N300 Router",                                None),
+])
+def test_derive_model(rest, model):
+    assert derive_model(rest) == model
+
+# ─────────────────────────────────────────────────────────────
+# lookup / identify
+# ─────────────────────────────────────────────────────────────
+def test_realm_first_word_match_keeps_only_the_model(index):
+    hit = index.lookup("realm", "TP-LINK Wireless N Router WR841N")
+    assert hit == {'brand': "TP-Link", 'model': "WR841N", 'via': "realm"}
+
+
+def test_table_model_beats_derived_model(index):
+    resp = {'headers': {'server': "Linksys E1200/1.0.04", 'www-authenticate': 'Basic realm="DGN2200"'},
+            'body': b""}
+    assert index.identify(resp) == {'brand': "Netgear", 'model': "DGN2200", 'via': "realm"}
+
+
+def test_favicon_kind_only_when_loaded(index):
+    assert not index.has("favicon")
+    index.update({'favicon': {favicon_hash(b"icon"): {'brand': "ASUS"}}})
+    assert index.has("favicon")
+    assert index.lookup("favicon", favicon_hash(b"icon"))['brand'] == "ASUS"
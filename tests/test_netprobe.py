@@ -0,0 +1,198 @@
+"""
+netprobe against local listeners: success, refused and timeout.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import netprobe
+from netprobe import http_get_async, probe_latency, race_http, summarize, sweep, tcp_connect_rtt
+
+LOCAL = "127.0.0.1"
+
+
+@pytest.fixture
+def listener():
+    """A listening TCP port on localhost; connections complete in the kernel backlog."""
+    s = socket.socket()
+    s.bind((LOCAL, 0))
+    s.listen(64)
+    yield s.getsockname()[1]
+    s.close()
+
+
+@pytest.fixture
+def closed_port():
+    """A port nothing listens on – connecting is refused."""
+    s = socket.socket()
+    s.bind((LOCAL, 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+@pytest.fixture
+def hanging_connect(monkeypatch):
+    """Make every connect hang, as an unanswered SYN would."""
+    async def never(*args, **kwargs):
+        await asyncio.sleep(3600)
+    monkeypatch.setattr(netprobe.asyncio, "open_connection", never)
+
+# ─────────────────────────────────────────────────────────────
+# tcp_connect_rtt
+# ─────────────────────────────────────────────────────────────
+def test_tcp_connect_rtt_success(listener):
+    rtt = asyncio.run(tcp_connect_rtt(LOCAL, listener, timeout=1.0))
+    assert rtt is not None and 0 <= rtt < 1000
+
+
+def test_tcp_connect_rtt_refused(closed_port):
+    assert asyncio.run(tcp_connect_rtt(LOCAL, closed_port, timeout=1.0)) is None
+
+
+def test_tcp_connect_rtt_timeout(hanging_connect):
+    t0 = time.perf_counter()
+    assert asyncio.run(tcp_connect_rtt(LOCAL, 1, timeout=0.2)) is None
+    assert time.perf_counter() - t0 < 1.0
+
+# ─────────────────────────────────────────────────────────────
+# probe_latency / summarize
+# ─────────────────────────────────────────────────────────────
+def test_probe_latency_success(listener):
+    r = probe_latency([(LOCAL, listener)], samples=3, timeout=1.0, interval=0)
+    assert r['reachable'] and r['sent'] == 3 and r['received'] == 3 and r['loss'] == 0.0
+    assert r['min'] <= r['p50'] <= r['p95'] <= r['max']
+    assert r['targets'][f"{LOCAL}:{listener}"]['received'] == 3
+
+
+def test_probe_latency_refused(closed_port):
+    r = probe_latency([(LOCAL, closed_port)], samples=2, timeout=1.0, interval=0)
+    assert not r['reachable'] and r['received'] == 0 and r['loss'] == 100.0
+    assert r['avg'] is None and r['jitter'] == 0.0
+
+
+def test_probe_latency_mixed(listener, closed_port):
+    r = probe_latency([(LOCAL, listener), (LOCAL, closed_port)], samples=2, timeout=1.0, interval=0)
+    assert r['reachable'] and r['sent'] == 4 and r['received'] == 2 and r['loss'] == 50.0
+    assert r['targets'][f"{LOCAL}:{closed_port}"]['loss'] == 100.0
+
+
+def test_probe_latency_timeout(hanging_connect):
+    t0 = time.perf_counter()
+    r  = probe_latency([(LOCAL, 1), (LOCAL, 2)], samples=2, timeout=0.1, interval=0)
+    assert not r['reachable'] and r['loss'] == 100.0
+    assert time.perf_counter() - t0 < 1.0                 # targets are sampled concurrently
+
+
+def test_summarize_jitter_stays_within_each_target():
+    near, far = [10.0, 10.0, 10.0], [50.0, 50.0, 50.0]
+    assert summarize(near + far, 6, series=[near, far])['jitter'] == 0.0
+    assert summarize([10.0, 12.0, 10.0], 3)['jitter'] == 2.0
+
+# ─────────────────────────────────────────────────────────────
+# sweep
+# ─────────────────────────────────────────────────────────────
+def test_sweep_finds_listening_port(listener, closed_port):
+    hits = sweep([LOCAL], ports=(closed_port, listener), timeout=1.0)
+    assert [(h['ip'], h['port']) for h in hits] == [(LOCAL, listener)]
+
+
+def test_sweep_refused(closed_port):
+    assert sweep([LOCAL], ports=(closed_port,), timeout=1.0) == []
+
+
+def test_sweep_deadline(hanging_connect):
+    t0 = time.perf_counter()
+    assert sweep([LOCAL, "127.0.0.2"], ports=(80, 8080), timeout=5.0, deadline=0.2) == []
+    assert time.perf_counter() - t0 < 1.0
+
+# ─────────────────────────────────────────────────────────────
+# http_get_async / race_http
+# ─────────────────────────────────────────────────────────────
+class _RouterPage(BaseHTTPRequestHandler):
+    """/ → a login page, /old → 302 to /, /away → 302 off-host, /slow → no answer for 2 s."""
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(2)
+        if self.path in ("/old", "/away"):
+            self.send_response(302)
+            self.send_header("Location", "/" if self.path == "/old" else "http://192.0.2.1/")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Server", "Linksys E1200/1.0.04")
+        self.end_headers()
+        self.wfile.write(b"<html><title>Router Login</title></html>")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_stub():
+    srv = ThreadingHTTPServer((LOCAL, 0), _RouterPage)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv.server_address[1]
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_http_get_success(http_stub):
+    r = asyncio.run(http_get_async(LOCAL, http_stub, timeout=2.0))
+    assert r['status'] == 200 and r['headers']['server'] == "Linksys E1200/1.0.04"
+    assert b"<title>Router Login</title>" in r['body']
+
+
+def test_http_get_follows_same_host_redirect(http_stub):
+    r = asyncio.run(http_get_async(LOCAL, http_stub, path="/old", timeout=2.0))
+    assert r['status'] == 200 and r['url'].endswith(f":{http_stub}/")
+
+
+def test_http_get_stops_at_off_host_redirect(http_stub):
+    r = asyncio.run(http_get_async(LOCAL, http_stub, path="/away", timeout=2.0))
+    assert r['status'] == 302 and r['headers']['location'] == "http://192.0.2.1/"
+
+
+def test_http_get_refused(closed_port):
+    with pytest.raises(OSError):
+        asyncio.run(http_get_async(LOCAL, closed_port, timeout=2.0))
+
+
+def test_http_get_timeout(http_stub):
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(http_get_async(LOCAL, http_stub, path="/slow", timeout=0.2))
+
+
+def server_of(resp):
+    return resp['headers'].get('server')
+
+
+def test_race_http_first_match_wins(http_stub, closed_port):
+    endpoints = (("http", closed_port), ("https", http_stub), ("http", http_stub))
+    assert race_http(LOCAL, server_of, endpoints, timeout=2.0) == "Linksys E1200/1.0.04"
+
+
+def test_race_http_no_match(http_stub):
+    assert race_http(LOCAL, lambda r: None, (("http", http_stub),), timeout=2.0) is None
+
+
+def test_race_http_refused(closed_port):
+    assert race_http(LOCAL, server_of, (("http", closed_port), ("https", closed_port)), timeout=1.0) is None
+
+
+def test_race_http_timeout(http_stub):
+    t0 = time.perf_counter()
+    assert race_http(LOCAL, server_of, (("http", http_stub),), timeout=0.2, path="/slow") is None
+    assert time.perf_counter() - t0 < 1.5
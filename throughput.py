@@ -0,0 +1,309 @@
+"""
+Multi-stream HTTP throughput engine and a bundled local test server.
+
+measure_download() / measure_upload() keep N HTTP/1.1 connections busy
+for a fixed duration.  Every stream reads into (or sends from) one
+preallocated buffer, so the hot loop never allocates; per-stream byte
+counters are sampled on a fixed interval and the first `warmup` seconds
+(TCP slow start, connection setup) are trimmed before the rate is taken.
+Results are megabits per second.
+
+LocalTestServer serves /download?bytes=N and accepts POST /upload on
+127.0.0.1 and counts every byte it moves, so the engine can be checked
+against an independent tally without touching the internet:
+
+    with LocalTestServer() as srv:
+        measure_download(srv.download_url, streams=4, duration=3)
+"""
+import http.client
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BUFFER_SIZE   = 256 * 1024
+UPLOAD_CHUNK  = 1024 * 1024          # bytes per POST body
+MAX_STREAM_ERRORS = 3
+
+
+def _connect(url, timeout):
+    parts = urlsplit(url)
+    cls   = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    path  = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    return cls(parts.hostname, parts.port, timeout=timeout), path
+
+
+class _Streams:
+    """N worker threads plus shared per-stream byte counters and a stop flag."""
+
+    def __init__(self, n):
+        self.counts = [0] * n
+        self.errors = [0] * n
+        self.stop   = threading.Event()
+        self.threads = []
+
+    def start(self, target, *args):
+        for i in range(len(self.counts)):
+            t = threading.Thread(target=target, args=(self, i) + args, name=f"tput-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def total(self):
+        return sum(self.counts)
+
+    def join(self, timeout):
+        self.stop.set()
+        for t in self.threads:
+            t.join(timeout)
+
+
+def _download_stream(streams, i, url, timeout, bufsize):
+    view = memoryview(bytearray(bufsize))
+    conn = None
+    while not streams.stop.is_set():
+        try:
+            if conn is None:
+                conn, path = _connect(url, timeout)
+            conn.request("GET", path, headers={"Cache-Control": "no-cache"})
+            resp = conn.getresponse()
+            if resp.status >= 400:
+                raise http.client.HTTPException(f"HTTP {resp.status}")
+            while not streams.stop.is_set():
+                n = resp.readinto(view)
+                if not n:
+                    break
+                streams.counts[i] += n
+            if streams.stop.is_set() or resp.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            if conn is not None:
+                conn.close()
+                conn = None
+            streams.errors[i] += 1
+            if streams.errors[i] >= MAX_STREAM_ERRORS:
+                return
+            streams.stop.wait(0.1)
+    if conn is not None:
+        conn.close()
+
+
+def _upload_stream(streams, i, url, timeout, payload, body_size):
+    conn = None
+    while not streams.stop.is_set():
+        try:
+            if conn is None:
+                conn, path = _connect(url, timeout)
+            conn.putrequest("POST", path)
+            conn.putheader("Content-Type", "application/octet-stream")
+            conn.putheader("Content-Length", str(body_size))
+            conn.endheaders()
+            sent = 0
+            while sent < body_size and not streams.stop.is_set():
+                n = min(len(payload), body_size - sent)
+                conn.send(payload[:n])
+                sent += n
+                streams.counts[i] += n
+            if sent < body_size:              # stopped mid-body – the connection is unusable
+                break
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                raise http.client.HTTPException(f"HTTP {resp.status}")
+            if resp.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            if conn is not None:
+                conn.close()
+                conn = None
+            streams.errors[i] += 1
+            if streams.errors[i] >= MAX_STREAM_ERRORS:
+                return
+            streams.stop.wait(0.1)
+    if conn is not None:
+        conn.close()
+
+
+def _measure(target, args, streams, duration, warmup, interval, on_sample, should_stop):
+    s = _Streams(streams)
+    t0 = time.monotonic()
+    s.start(target, *args)
+    samples = [(0.0, 0)]                      # (elapsed, total bytes)
+    try:
+        while True:
+            time.sleep(interval)
+            elapsed = time.monotonic() - t0
+            samples.append((elapsed, s.total()))
+            if on_sample:
+                (t1, b1), (t2, b2) = samples[-2], samples[-1]
+                on_sample(min(1.0, elapsed / duration), (b2 - b1) * 8 / (t2 - t1) / 1e6)
+            if elapsed >= duration or (should_stop and should_stop()):
+                break
+            if all(e >= MAX_STREAM_ERRORS for e in s.errors):
+                break
+    finally:
+        s.join(timeout=2)
+    return summarize_samples(samples, warmup, streams, sum(s.errors))
+
+
+def summarize_samples(samples, warmup, streams=1, errors=0):
+    """
+    [(elapsed_s, total_bytes)] → {'mbps', 'peak_mbps', 'bytes', 'seconds',
+    'streams', 'errors', 'series'}.  Samples before `warmup` seconds are
+    dropped; if that leaves fewer than two, the whole run is used.
+    """
+    kept = [p for p in samples if p[0] >= warmup]
+    if len(kept) < 2:
+        kept = samples
+    series = [round((b2 - b1) * 8 / (t2 - t1) / 1e6, 2)
+              for (t1, b1), (t2, b2) in zip(kept, kept[1:]) if t2 > t1]
+    (ta, ba), (tb, bb) = kept[0], kept[-1]
+    secs = tb - ta
+    return {'mbps': round((bb - ba) * 8 / secs / 1e6, 2) if secs > 0 else 0.0,
+            'peak_mbps': max(series, default=0.0),
+            'bytes': samples[-1][1],
+            'seconds': round(samples[-1][0], 2),
+            'streams': streams,
+            'errors': errors,
+            'series': series}
+
+
+def measure_download(url, streams=4, duration=8.0, warmup=2.0, interval=0.25, timeout=10,
+                     on_sample=None, should_stop=None, bufsize=BUFFER_SIZE):
+    """
+    Download `url` on `streams` parallel connections (re-requesting it as
+    each response ends) for `duration` seconds.  on_sample(fraction, mbps)
+    is called every `interval`; should_stop() ends the run early.
+    """
+    return _measure(_download_stream, (url, timeout, bufsize), streams, duration, warmup, interval,
+                    on_sample, should_stop)
+
+
+def measure_upload(url, streams=4, duration=8.0, warmup=2.0, interval=0.25, timeout=10,
+                   on_sample=None, should_stop=None, body_size=UPLOAD_CHUNK, bufsize=BUFFER_SIZE):
+    """POST `body_size`-byte bodies to `url` on `streams` connections; same contract as measure_download()."""
+    payload = memoryview(bytes(bufsize))      # one read-only buffer shared by every stream
+    return _measure(_upload_stream, (url, timeout, payload, body_size), streams, duration, warmup, interval,
+                    on_sample, should_stop)
+
+# ─────────────────────────────────────────────────────────────
+# LOCAL TEST SERVER
+# ─────────────────────────────────────────────────────────────
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ZEROS = memoryview(bytes(BUFFER_SIZE))
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path != "/download":
+            self.send_error(404)
+            return
+        size = int(parse_qs(parts.query).get("bytes", [100 * 1024 * 1024])[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        left = size
+        try:
+            while left > 0:
+                n = min(left, len(self.ZEROS))
+                self.wfile.write(self.ZEROS[:n])
+                left -= n
+                self.server.count("sent", n)
+        except OSError:
+            self.close_connection = True
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/upload":
+            self.send_error(404)
+            return
+        left = int(self.headers.get("Content-Length") or 0)
+        view = memoryview(bytearray(BUFFER_SIZE))
+        try:
+            while left > 0:
+                n = self.rfile.readinto(view[:min(left, BUFFER_SIZE)])
+                if not n:
+                    self.close_connection = True
+                    return
+                left -= n
+                self.server.count("received", n)
+        except OSError:
+            self.close_connection = True
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class LocalTestServer(ThreadingHTTPServer):
+    """
+    Throughput test endpoint on 127.0.0.1 that tallies bytes sent and
+    received.  With `limit_mbps` the server paces all connections together
+    to that aggregate rate, so a measurement has a known right answer.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, limit_mbps=None):
+        super().__init__((host, port), _Handler)
+        self.limit_mbps = limit_mbps
+        self._lock    = threading.Lock()
+        self._thread  = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sent     = 0
+            self.received = 0
+            self._t0      = None
+
+    def count(self, kind, n):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + n)
+            if self._t0 is None:
+                self._t0 = time.monotonic()
+            if not self.limit_mbps:
+                return
+            due = self._t0 + (self.sent + self.received) * 8 / (self.limit_mbps * 1e6)
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def download_url(self):
+        return f"{self.base_url}/download?bytes={64 * 1024 * 1024}"
+
+    @property
+    def upload_url(self):
+        return f"{self.base_url}/upload"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="tput-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        """Stay quiet when a client hangs up at the end of its test window – that is by design."""
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError, ConnectionAbortedError)):
+            return
+        super().handle_error(request, client_address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
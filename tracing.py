@@ -0,0 +1,266 @@
+"""
+Lightweight timing spans for the app's helpers.
+
+TRACER.span() / @traced time a block and attach to it every subprocess
+started (command + exit code) and every network round trip (DNS lookup,
+TCP connect) made in the same context – including pool threads that were
+handed the caller's context.  Spans nest through a ContextVar; finished
+spans go to a bounded buffer, and chrome_trace() exports them in the
+Chrome trace-event format that chrome://tracing, Perfetto and speedscope
+load as a flame graph.
+
+Attributing subprocesses and sockets needs install(), which swaps
+subprocess.Popen for a recording subclass and adds a sys audit hook;
+without it spans only measure wall time.  It patches the whole process,
+so it is decided once at startup – install_from_env() installs when
+WIFI_MANAGER_TRACE is set to a non-empty value other than 0.
+"""
+import contextlib
+import contextvars
+import functools
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+_current  = contextvars.ContextVar("tracing_span", default=None)
+_ids      = itertools.count(1)
+_PERF0, _WALL0 = time.perf_counter(), time.time()      # perf_counter → epoch for the export
+
+_NET_EVENTS = {"socket.connect": "connect", "socket.getaddrinfo": "dns"}
+
+TRACE_ENV = "WIFI_MANAGER_TRACE"
+
+
+def _wall_us(t):
+    return int((_WALL0 + t - _PERF0) * 1e6)
+
+
+def _cmd(args):
+    if isinstance(args, (list, tuple)):
+        return " ".join(os.path.basename(str(args[0])) if i == 0 else str(a) for i, a in enumerate(args))
+    return str(args)
+
+
+class Span:
+    """One timed block: wall time, subprocesses, network round trips."""
+
+    __slots__ = ('id', 'name', 'parent', 'thread', 'start', 'end', 'attrs', 'procs', 'net', 'error')
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.id     = next(_ids)
+        self.name   = name
+        self.parent = parent
+        self.thread = threading.get_ident()
+        self.attrs  = dict(attrs or {})
+        self.procs  = []              # {'cmd', 'code', 'popen'} – popen dropped at finish
+        self.net    = []              # (kind, target, perf_counter)
+        self.error  = None
+        self.end    = None
+        self.start  = time.perf_counter()
+
+    @property
+    def wall_start(self):
+        return _WALL0 + self.start - _PERF0
+
+    @property
+    def seconds(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def _finish(self):
+        self.end = time.perf_counter()
+        for p in self.procs:
+            popen = p.pop('popen', None)
+            if popen is not None:
+                p['code'] = popen.returncode          # None: still running when the span ended
+
+    def as_dict(self):
+        return {'id': self.id, 'name': self.name, 'parent': self.parent,
+                'ms': round(self.seconds * 1000, 2),
+                'subprocesses': len(self.procs),
+                'exit_codes': [p.get('code') for p in self.procs],
+                'round_trips': len(self.net),
+                'error': self.error, **self.attrs}
+
+
+class _TracedPopen(subprocess.Popen):
+    """subprocess.Popen that reports itself to the current span."""
+
+    def __init__(self, args, *a, **kw):
+        s = _current.get()
+        try:
+            super().__init__(args, *a, **kw)
+        except OSError as e:
+            if s is not None:
+                s.procs.append({'cmd': _cmd(args), 'code': None, 'error': type(e).__name__})
+            raise
+        if s is not None:
+            s.procs.append({'cmd': _cmd(args), 'code': None, 'popen': self})
+
+
+def _audit(event, args):
+    kind = _NET_EVENTS.get(event)
+    if kind is None or not _tracer_installed():
+        return
+    s = _current.get()
+    if s is None:
+        return
+    if kind == "dns":
+        target = f"{args[0]}:{args[1]}" if args[1] else str(args[0])
+    else:
+        addr   = args[1]
+        target = f"{addr[0]}:{addr[1]}" if isinstance(addr, tuple) else str(addr)
+    s.net.append((kind, target, time.perf_counter()))
+
+
+class Tracer:
+    """Bounded buffer of finished spans plus the hooks that feed them."""
+
+    def __init__(self, capacity=2000):
+        self.spans     = deque(maxlen=capacity)
+        self.installed = False
+        self.threads   = {}           # ident → thread name, for the export
+        self._hooked   = False
+        self._popen    = subprocess.Popen
+        self._lock     = threading.Lock()
+
+    # ── hooks ──
+    def install(self):
+        """Start attributing subprocesses and sockets to spans (idempotent)."""
+        with self._lock:
+            if not self._hooked:
+                sys.addaudithook(_audit)          # audit hooks cannot be removed – gated on `installed`
+                self._hooked = True
+            if not self.installed:
+                self._popen, subprocess.Popen = subprocess.Popen, _TracedPopen
+                self.installed = True
+        return self
+
+    def uninstall(self):
+        with self._lock:
+            if self.installed:
+                subprocess.Popen = self._popen
+                self.installed = False
+        return self
+
+    # ── spans ──
+    def _record(self, s):
+        s._finish()
+        with self._lock:
+            if len(self.threads) > 256:               # thread idents are recycled – keep the map small
+                self.threads.clear()
+            self.threads.setdefault(s.thread, threading.current_thread().name)
+            self.spans.append(s)
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        parent = _current.get()
+        s = Span(name, parent.id if parent is not None else None, attrs)
+        token = _current.set(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self._record(s)
+
+    def begin(self, name, **attrs):
+        """
+        Open a root span for code that cannot sit in a with-block (a whole
+        script run); it is current in this context until end().
+        """
+        s = Span(name, None, attrs)
+        _current.set(s)
+        return s
+
+    def end(self, s):
+        if _current.get() is s:
+            _current.set(None)
+        self._record(s)
+        return s
+
+    def abandon(self, s):
+        """
+        Close a root span whose end() was never reached (the script was
+        stopped or rerun midway): it ends with its last finished descendant.
+        """
+        if s.end is not None:
+            return s
+        ends = [c.end for _, c in self.tree(s)[1:]]
+        s.error = s.error or "interrupted"
+        self._record(s)
+        s.end = max(ends, default=s.start)
+        return s
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    # ── reading ──
+    def _copy(self):
+        """(spans, threads) copied under the lock – other threads keep recording."""
+        with self._lock:
+            return list(self.spans), dict(self.threads)
+
+    def tree(self, root):
+        """[(depth, Span)] for `root` and every finished descendant, in start order."""
+        depth = {root.id: 0}
+        out   = [(0, root)]
+        for s in sorted(self._copy()[0], key=lambda s: s.start):
+            if s.parent in depth and s.id not in depth:
+                depth[s.id] = depth[s.parent] + 1
+                out.append((depth[s.id], s))
+        return out
+
+    def roots(self, exclude=(), limit=20):
+        """The newest finished root spans (background threads, jobs), newest first."""
+        return [s for s in reversed(self._copy()[0]) if s.parent is None and s.name not in exclude][:limit]
+
+    def chrome_trace(self, spans=None):
+        """Spans as a Chrome trace-event dict ({'traceEvents': [...]}) – json.dump it to a .json file."""
+        pid    = os.getpid()
+        recorded, threads = self._copy()
+        spans  = recorded if spans is None else list(spans)
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'WiFi Manager Pro'}}]
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                   for tid, name in threads.items()]
+        for s in spans:
+            args = {k: v for k, v in s.as_dict().items() if k not in ('name', 'ms')}
+            args['commands'] = [f"{p['cmd']} → {p.get('code', p.get('error'))}" for p in s.procs]
+            events.append({'name': s.name, 'cat': 'helper', 'ph': 'X', 'pid': pid, 'tid': s.thread,
+                           'ts': _wall_us(s.start), 'dur': max(1, int(s.seconds * 1e6)), 'args': args})
+            events += [{'name': f"{kind} {target}", 'cat': 'net', 'ph': 'i', 's': 't', 'pid': pid,
+                        'tid': s.thread, 'ts': _wall_us(t)} for kind, target, t in s.net]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+TRACER = Tracer()
+
+
+def _tracer_installed():
+    return TRACER.installed
+
+
+def install_from_env(environ=os.environ):
+    """Install TRACER's hooks if TRACE_ENV asks for it; returns whether they are on."""
+    if environ.get(TRACE_ENV, "") not in ("", "0"):
+        TRACER.install()
+    return TRACER.installed
+
+
+def traced(name=None, **attrs):
+    """Decorator: run the function inside TRACER.span(name or its __name__)."""
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with TRACER.span(label, **attrs):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
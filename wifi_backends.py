@@ -0,0 +1,597 @@
+"""
+Pluggable WiFi backends: scan, current SSID and default gateway.
+
+Every backend answers the same three questions (plus the current link
+level where it can).  The Linux fast path reads /proc/net/route and
+/proc/net/wireless and talks nl80211 over a generic-netlink socket, so the
+cheap queries (gateway, SSID, link level, reading the kernel's cached scan
+results) never spawn a process.  Its scan records use nmcli's security
+vocabulary, so passive and active scans of the same air compare equal.  The command-line backends keep the original
+nmcli / netsh / airport parsing; their parsers are plain functions over
+command output.  select_backend() picks a chain once per process.
+
+A backend raises BackendUnavailable when it cannot answer a question at
+all; None / [] are real answers ("not connected", "nothing in range").
+"""
+import os
+import platform
+import re
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+from capabilities import capabilities
+
+AIRPORT = '/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport'
+
+
+class BackendUnavailable(Exception):
+    """This backend cannot answer the question – try the next one."""
+
+
+def run_command(args, timeout):
+    return subprocess.check_output(args, timeout=timeout).decode('utf-8', errors='ignore')
+
+
+def dbm_to_percent(dbm):
+    """NetworkManager's mapping: -100 dBm → 0 %, -50 dBm → 100 %."""
+    return max(0, min(100, 2 * (int(dbm) + 100)))
+
+
+def freq_to_channel(mhz):
+    if mhz == 2484:
+        return 14
+    if 2412 <= mhz < 2484:
+        return (mhz - 2407) // 5
+    if 5955 <= mhz <= 7115:
+        return (mhz - 5950) // 5
+    if 5000 <= mhz < 5955:
+        return (mhz - 5000) // 5
+    return None
+
+# ─────────────────────────────────────────────────────────────
+# TEXT PARSERS  (command output → values)
+# ─────────────────────────────────────────────────────────────
+def parse_netsh_networks(output):
+    """`netsh wlan show networks mode=bssid` → one entry per BSSID (per SSID without mode=bssid)."""
+    networks, cur, bss = [], {}, None
+    for line in output.split('\n'):
+        line = line.strip()
+        m = re.match(r'SSID \d+\s*:\s*(.*)', line)          # hidden networks print "SSID 2 :"
+        if m:
+            if cur and bss is None: networks.append(cur)
+            cur, bss = {'ssid': m.group(1).strip() or 'Hidden', 'signal': 0, 'security': 'Unknown'}, None
+        if 'Authentication' in line:
+            cur['security'] = line.split(':')[1].strip()
+        m = re.match(r'BSSID \d+\s*: (\S+)', line)
+        if m and cur:
+            bss = dict(cur, bssid=m.group(1).lower())
+            networks.append(bss)
+        m2 = re.match(r'Signal\s*:\s*(\d+)%', line)
+        if m2: (bss or cur)['signal'] = int(m2.group(1))
+        m3 = re.match(r'Channel\s*:\s*(\S+)', line)       # not "Channel Utilization:" (Bss Load)
+        if m3 and cur: (bss or cur)['channel'] = m3.group(1)
+    if cur and bss is None: networks.append(cur)
+    return networks
+
+
+def parse_nmcli_networks(output):
+    networks = []
+    for line in output.split('\n')[1:]:
+        if line.strip():
+            p = line.split()
+            if len(p) >= 2:
+                networks.append({'ssid': p[0] if p[0]!='--' else 'Hidden',
+                                 'signal': int(p[1]) if p[1].isdigit() else 0,
+                                 'security': ' '.join(p[2:-1]) if len(p)>3 else 'Open',
+                                 'channel': p[-1] if len(p)>2 else 'N/A'})
+    return networks
+
+
+# terse (-t) output escapes ':' and '\' with a backslash
+NMCLI_SCAN_FIELDS = 'SSID,BSSID,SIGNAL,SECURITY,CHAN,FREQ,RATE,MODE'
+
+
+def _unescape(field):
+    return field.replace('\x01', ':').replace('\x00', '\\') if ('\x01' in field or '\x00' in field) else field
+
+
+def split_terse(line):
+    """Split one `nmcli -t` line on unescaped colons."""
+    return [_unescape(f) for f in line.replace('\\\\', '\x00').replace('\\:', '\x01').split(':')]
+
+
+def parse_nmcli_terse(output):
+    """
+    Single pass over `nmcli -t -f SSID,BSSID,SIGNAL,SECURITY,CHAN,FREQ,RATE,MODE
+    dev wifi list`.  Escapes are swapped for placeholders once for the whole
+    buffer, so each row is one C-level split(); SSIDs may contain spaces
+    and colons.  Per row it costs ~1.8x the old whitespace parser, which
+    built 4 fields and broke SSIDs with spaces; the difference is building
+    the 8-field record, not splitting (see benchmarks/bench_nmcli.py).
+    """
+    text = output.replace('\\\\', '\x00').replace('\\:', '\x01')
+    networks = []
+    append = networks.append
+    for line in text.split('\n'):
+        p = line.split(':')
+        if len(p) != 8:
+            continue
+        ssid, bssid, sig, sec, chan, freq, rate, mode = p
+        if '\x01' in ssid or '\x00' in ssid:
+            ssid = _unescape(ssid)
+        append({'ssid': ssid or 'Hidden',
+                'signal': int(sig) if sig.isdigit() else 0,
+                'security': sec if sec and sec != '--' else 'Open',
+                'channel': chan or 'N/A',
+                'bssid': bssid.replace('\x01', ':').lower(),
+                'freq': int(freq.split(' ', 1)[0]) if freq[:1].isdigit() else 0,
+                'rate': rate,
+                'mode': mode})
+    return networks
+
+
+_AIRPORT_ROW_RE = re.compile(r'^\s*(.*?)\s+([0-9a-f]{2}(?::[0-9a-f]{2}){5})\s+(-?\d+)\s+(\S+)(?:\s+\S+\s+\S+\s+(.*?))?\s*$', re.I)
+
+
+def parse_airport_networks(output):
+    """`airport -s` → one entry per BSSID; SSIDs are right-aligned and may contain spaces."""
+    networks = []
+    for line in output.split('\n')[1:]:
+        m = _AIRPORT_ROW_RE.match(line)
+        if m:
+            ssid, bssid, rssi, chan, security = m.groups()
+            signal = max(0, min(100, (int(rssi)+90)*100//60))
+            security = (security or '').split('(')[0].strip()
+            networks.append({'ssid': ssid or 'Hidden', 'signal': signal, 'bssid': bssid.lower(),
+                             'security': security if security and security != 'NONE' else 'Open',
+                             'channel': chan.split(',')[0]})
+    return networks
+
+
+def parse_netsh_current(output):
+    m = re.search(r'SSID\s*:\s*(.*)', output)
+    return m.group(1).strip() if m else None
+
+
+def parse_nmcli_current(output):
+    for line in output.split('\n'):
+        if line.lower().startswith('yes:'):
+            return split_terse(line)[1]
+    return None
+
+
+def parse_airport_current(output):
+    m = re.search(r'\sSSID:\s*(.*)', output)
+    return m.group(1).strip() if m else None
+
+
+def parse_ipconfig_gateway(output):
+    """First IPv4 default gateway; it may sit on a continuation line under an IPv6 one."""
+    lines = output.split('\n')
+    for i, line in enumerate(lines):
+        if 'Default Gateway' not in line:
+            continue
+        values = [line.split(':', 1)[-1]]
+        for nxt in lines[i + 1:]:
+            if not nxt.startswith(' ') or ' : ' in nxt or not nxt.strip():
+                break
+            values.append(nxt)
+        for v in values:
+            m = re.match(r'\s*(\d+\.\d+\.\d+\.\d+)\s*$', v)
+            if m:
+                return m.group(1)
+    return None
+
+
+def parse_ip_route_gateway(output):
+    m = re.search(r'default via ([\d.]+)', output)
+    return m.group(1).strip() if m else None
+
+
+def parse_netstat_gateway(output):
+    for line in output.split('\n'):
+        if line.startswith('default'):
+            parts = line.split()
+            if len(parts) >= 2:
+                return parts[1]
+    return None
+
+
+def parse_proc_route(text):
+    """/proc/net/route → default-gateway IP with the lowest metric, or None."""
+    best = None
+    for line in text.split('\n')[1:]:
+        p = line.split()
+        if len(p) >= 7 and p[1] == '00000000' and int(p[3], 16) & 0x2:   # RTF_GATEWAY
+            metric = int(p[6])
+            if best is None or metric < best[0]:
+                best = (metric, socket.inet_ntoa(struct.pack('<L', int(p[2], 16))))
+    return best[1] if best else None
+
+
+def parse_proc_wireless(text):
+    """/proc/net/wireless → {iface: {'link', 'level'}} (level in dBm)."""
+    out = {}
+    for line in text.split('\n')[2:]:
+        if ':' not in line:
+            continue
+        iface, rest = line.split(':', 1)
+        p = rest.split()
+        if len(p) >= 3:
+            out[iface.strip()] = {'link': float(p[1].rstrip('.')), 'level': float(p[2].rstrip('.'))}
+    return out
+
+# ─────────────────────────────────────────────────────────────
+# NL80211 (generic netlink, no subprocess)
+# ─────────────────────────────────────────────────────────────
+NETLINK_GENERIC = 16
+GENL_ID_CTRL    = 0x10
+CTRL_CMD_GETFAMILY, CTRL_ATTR_FAMILY_ID, CTRL_ATTR_FAMILY_NAME = 3, 1, 2
+NLM_F_REQUEST, NLM_F_ACK, NLM_F_DUMP = 0x1, 0x4, 0x300
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+NL80211_CMD_GET_INTERFACE, NL80211_CMD_GET_SCAN = 5, 32
+NL80211_ATTR_IFINDEX, NL80211_ATTR_IFNAME, NL80211_ATTR_IFTYPE = 3, 4, 5
+NL80211_ATTR_BSS, NL80211_ATTR_SSID = 47, 52
+NL80211_BSS_BSSID, NL80211_BSS_FREQUENCY, NL80211_BSS_CAPABILITY = 1, 2, 5
+NL80211_BSS_INFORMATION_ELEMENTS, NL80211_BSS_SIGNAL_MBM = 6, 7
+NL80211_IFTYPE_STATION = 2
+
+
+def _nla(attr_type, data):
+    hdr = struct.pack('=HH', 4 + len(data), attr_type)
+    return hdr + data + b'\0' * (-len(data) % 4)
+
+
+def parse_nlattrs(data):
+    """Netlink attribute TLVs → {type: payload bytes}."""
+    attrs, off = {}, 0
+    while off + 4 <= len(data):
+        length, attr_type = struct.unpack_from('=HH', data, off)
+        if length < 4:
+            break
+        attrs[attr_type & 0x3fff] = data[off + 4:off + length]
+        off += (length + 3) & ~3
+    return attrs
+
+
+_RSN_OUI, _WPA_OUI = b'\x00\x0f\xac', b'\x00\x50\xf2'
+_AKM_WPA2 = {1, 2, 3, 4, 5, 6}        # 802.1X / PSK, incl. FT and SHA-256 variants
+_AKM_WPA3 = {8, 9}                    # SAE, FT-SAE
+_AKM_OWE  = {18}
+_AKM_EAP  = {1, 3, 5}
+
+
+def _akm_suites(body, oui):
+    """AKM suite types of an RSN-layout element body (version, group, pairwise list, AKM list)."""
+    try:
+        off  = 6 + 2 + 4 * struct.unpack_from('<H', body, 6)[0]
+        n    = struct.unpack_from('<H', body, off)[0]
+        return {body[off + 2 + 4 * i + 3] for i in range(n) if body[off + 2 + 4 * i:off + 5 + 4 * i] == oui}
+    except (struct.error, IndexError):
+        return set()
+
+
+def parse_ies(ies):
+    """
+    802.11 information elements → (ssid, security).  Security uses nmcli's
+    tokens ('WPA1', 'WPA2', 'WPA3', 'OWE', '802.1X', space-joined); None
+    when neither WPA nor RSN is advertised.
+    """
+    ssid, rsn, wpa = None, None, None
+    off = 0
+    while off + 2 <= len(ies):
+        eid, ln = ies[off], ies[off + 1]
+        body = ies[off + 2:off + 2 + ln]
+        if eid == 0 and ssid is None:
+            ssid = body.decode('utf-8', errors='replace')
+        elif eid == 48:
+            rsn = _akm_suites(body, _RSN_OUI)
+        elif eid == 221 and body[:4] == _WPA_OUI + b'\x01':
+            wpa = _akm_suites(body[4:], _WPA_OUI)
+        off += 2 + ln
+    if rsn is None and wpa is None:
+        return ssid, None
+    tokens = []
+    if wpa is not None:
+        tokens.append('WPA1')
+    if rsn is not None and (rsn & _AKM_WPA2 or not rsn):
+        tokens.append('WPA2')
+    if rsn and rsn & _AKM_WPA3:
+        tokens.append('WPA3')
+    if rsn and rsn & _AKM_OWE:
+        tokens.append('OWE')
+    if (rsn or set()) & _AKM_EAP or 1 in (wpa or set()):
+        tokens.append('802.1X')
+    return ssid, ' '.join(tokens)
+
+
+def parse_bss(attrs):
+    """One NL80211_ATTR_BSS (already split) → network dict."""
+    bss   = parse_nlattrs(attrs[NL80211_ATTR_BSS])
+    ssid, security = parse_ies(bss.get(NL80211_BSS_INFORMATION_ELEMENTS, b''))
+    cap = struct.unpack('=H', bss[NL80211_BSS_CAPABILITY][:2])[0] if NL80211_BSS_CAPABILITY in bss else 0
+    if security is None:
+        security = 'WEP' if cap & 0x10 else 'Open'
+    freq   = struct.unpack('=I', bss[NL80211_BSS_FREQUENCY][:4])[0] if NL80211_BSS_FREQUENCY in bss else 0
+    mbm    = struct.unpack('=i', bss[NL80211_BSS_SIGNAL_MBM][:4])[0] if NL80211_BSS_SIGNAL_MBM in bss else -10000
+    return {'ssid': ssid or 'Hidden',
+            'signal': dbm_to_percent(mbm / 100),
+            'security': security,
+            'channel': str(freq_to_channel(freq) or 'N/A'),
+            'bssid': ':'.join(f'{b:02x}' for b in bss.get(NL80211_BSS_BSSID, b'')),
+            'freq': freq,
+            'mode': 'Infra' if cap & 0x1 else 'Ad-Hoc' if cap & 0x2 else ''}   # ESS / IBSS bits; no rate
+
+
+class _Genl:
+    """Tiny generic-netlink request/response helper."""
+
+    def __init__(self, timeout=2.0):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_GENERIC)
+        self.sock.settimeout(timeout)
+        self.sock.bind((0, 0))
+        self.seq  = int(time.time())
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.sock.close()
+
+    def request(self, family, cmd, attrs=b'', dump=False):
+        """Send one command; return the attribute dicts of every reply."""
+        with self.lock:
+            self.seq += 1
+            payload = struct.pack('=BBH', cmd, 1, 0) + attrs
+            flags   = NLM_F_REQUEST | NLM_F_ACK | (NLM_F_DUMP if dump else 0)
+            self.sock.send(struct.pack('=IHHII', 16 + len(payload), family, flags, self.seq, 0) + payload)
+            replies = []
+            while True:
+                data, off = self.sock.recv(1 << 17), 0
+                while off + 16 <= len(data):
+                    length, mtype, _, seq, _ = struct.unpack_from('=IHHII', data, off)
+                    body = data[off + 16:off + length]
+                    off += (length + 3) & ~3
+                    if seq != self.seq:
+                        continue
+                    if mtype == NLMSG_DONE:
+                        return replies
+                    if mtype == NLMSG_ERROR:
+                        err = struct.unpack_from('=i', body)[0]
+                        if err:
+                            raise OSError(-err, os.strerror(-err))
+                        return replies                    # plain ACK
+                    replies.append(parse_nlattrs(body[4:]))
+
+    def family_id(self, name):
+        reply = self.request(GENL_ID_CTRL, CTRL_CMD_GETFAMILY, _nla(CTRL_ATTR_FAMILY_NAME, name.encode() + b'\0'))
+        return struct.unpack('=H', reply[0][CTRL_ATTR_FAMILY_ID][:2])[0]
+
+# ─────────────────────────────────────────────────────────────
+# BACKENDS
+# ─────────────────────────────────────────────────────────────
+class WifiBackend:
+    """Interface – scan(rescan), current_ssid(), default_gateway()."""
+
+    name = "base"
+
+    def scan(self, rescan=True):
+        raise BackendUnavailable(self.name)
+
+    def current_ssid(self):
+        raise BackendUnavailable(self.name)
+
+    def default_gateway(self):
+        raise BackendUnavailable(self.name)
+
+    def link_level(self):
+        """Signal of the current link in dBm, or None when not associated."""
+        raise BackendUnavailable(self.name)
+
+
+class LinuxFastBackend(WifiBackend):
+    """
+    procfs + nl80211.  Reads only – it cannot trigger an active rescan
+    (that needs CAP_NET_ADMIN), so scan(rescan=True) defers to the next
+    backend while scan(rescan=False) returns the kernel's cached BSS list.
+    """
+
+    name = "procfs/nl80211"
+
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+        self.has_nl80211 = None       # unknown until first use
+        self._genl = None
+        self._family = None
+
+    @classmethod
+    def probe(cls):
+        """Return a backend with nl80211 resolved up front (it may still lack it)."""
+        b = cls()
+        try:
+            b._nl()
+        except OSError:
+            pass
+        return b
+
+    def _nl(self):
+        if self.has_nl80211 is False:
+            raise OSError("nl80211 not available")
+        if self._genl is None:
+            try:
+                genl = _Genl()
+            except OSError:
+                self.has_nl80211 = False
+                raise
+            try:
+                self._family = genl.family_id('nl80211')
+            except (OSError, KeyError, IndexError):
+                genl.close()
+                self.has_nl80211 = False
+                raise OSError("nl80211 not available")
+            self._genl, self.has_nl80211 = genl, True
+        return self._genl
+
+    def _read(self, name):
+        with open(os.path.join(self.proc_root, 'net', name)) as f:
+            return f.read()
+
+    def wireless_interfaces(self):
+        try:
+            return parse_proc_wireless(self._read('wireless'))
+        except OSError:
+            raise BackendUnavailable(self.name)
+
+    def link_level(self):
+        for stats in self.wireless_interfaces().values():
+            if stats['link'] > 0:
+                return stats['level']
+        return None
+
+    def interfaces(self):
+        out = []
+        for a in self._nl().request(self._family, NL80211_CMD_GET_INTERFACE, dump=True):
+            out.append({'ifindex': struct.unpack('=I', a[NL80211_ATTR_IFINDEX][:4])[0],
+                        'ifname':  a.get(NL80211_ATTR_IFNAME, b'').rstrip(b'\0').decode(),
+                        'iftype':  struct.unpack('=I', a[NL80211_ATTR_IFTYPE][:4])[0] if NL80211_ATTR_IFTYPE in a else None,
+                        'ssid':    a[NL80211_ATTR_SSID].decode('utf-8', errors='replace') if NL80211_ATTR_SSID in a else None})
+        return out
+
+    def default_gateway(self):
+        try:
+            return parse_proc_route(self._read('route'))
+        except OSError:
+            raise BackendUnavailable(self.name)
+
+    def current_ssid(self):
+        try:
+            for i in self.interfaces():
+                if i['iftype'] == NL80211_IFTYPE_STATION and i['ssid']:
+                    return i['ssid']
+            return None
+        except OSError:
+            raise BackendUnavailable(self.name)
+
+    def scan(self, rescan=True):
+        if rescan:
+            raise BackendUnavailable(f"{self.name}: active rescan needs NetworkManager")
+        try:
+            networks = []
+            for i in self.interfaces():
+                if i['iftype'] != NL80211_IFTYPE_STATION:
+                    continue
+                for a in self._nl().request(self._family, NL80211_CMD_GET_SCAN,
+                                            _nla(NL80211_ATTR_IFINDEX, struct.pack('=I', i['ifindex'])), dump=True):
+                    if NL80211_ATTR_BSS in a:
+                        networks.append(parse_bss(a))
+            return networks
+        except OSError:
+            raise BackendUnavailable(self.name)
+
+
+class NmcliBackend(WifiBackend):
+    name = "nmcli"
+
+    def __init__(self, run=run_command):
+        self.run = run
+
+    def scan(self, rescan=True):
+        if rescan:
+            subprocess.run(['nmcli','radio','wifi','on'], capture_output=True, timeout=5)
+            subprocess.run(['nmcli','device','wifi','rescan'], capture_output=True, timeout=5)
+            time.sleep(2)
+        return parse_nmcli_terse(self.run(['nmcli','-t','-e','yes','-f',NMCLI_SCAN_FIELDS,'dev','wifi','list',
+                                           '--rescan','no'], 10))
+
+    def current_ssid(self):
+        return parse_nmcli_current(self.run(['nmcli', '-t', '-f', 'Active,SSID', 'dev', 'wifi'], 5))
+
+    def default_gateway(self):
+        return parse_ip_route_gateway(self.run(['ip', 'route'], 5))
+
+
+class NetshBackend(WifiBackend):
+    name = "netsh"
+
+    def __init__(self, run=run_command):
+        self.run = run
+
+    def scan(self, rescan=True):
+        if rescan:
+            subprocess.run(['netsh','wlan','set','autoconfig','enabled=yes','interface="Wi-Fi"'], capture_output=True, timeout=5)
+        return parse_netsh_networks(self.run(['netsh','wlan','show','networks','mode=bssid'], 10))
+
+    def current_ssid(self):
+        return parse_netsh_current(self.run(['netsh', 'wlan', 'show', 'interfaces'], 5))
+
+    def default_gateway(self):
+        return parse_ipconfig_gateway(self.run(['ipconfig'], 5))
+
+
+class AirportBackend(WifiBackend):
+    name = "airport"
+
+    def __init__(self, run=run_command):
+        self.run = run
+
+    def scan(self, rescan=True):
+        return parse_airport_networks(self.run([AIRPORT, '-s'], 10))
+
+    def current_ssid(self):
+        return parse_airport_current(self.run([AIRPORT, '-I'], 5))
+
+    def default_gateway(self):
+        return parse_netstat_gateway(self.run(['netstat', '-rn'], 5))
+
+
+class ChainBackend(WifiBackend):
+    """Ask each backend in turn until one can answer."""
+
+    def __init__(self, *backends):
+        self.backends = [b for b in backends if b is not None]
+        self.name = "+".join(b.name for b in self.backends) or "none"
+
+    def _ask(self, method, *args):
+        last = None
+        for b in self.backends:
+            try:
+                return getattr(b, method)(*args)
+            except BackendUnavailable as e:
+                last = e
+        raise last or BackendUnavailable("no backend")
+
+    def scan(self, rescan=True):
+        return self._ask('scan', rescan)
+
+    def current_ssid(self):
+        return self._ask('current_ssid')
+
+    def default_gateway(self):
+        return self._ask('default_gateway')
+
+    def link_level(self):
+        return self._ask('link_level')
+
+
+_selected      = None
+_selected_lock = threading.Lock()
+
+
+def select_backend(system=None):
+    """Build (once per process) the backend chain for this OS."""
+    global _selected
+    with _selected_lock:
+        if _selected is None or system is not None:
+            system = system or platform.system()
+            if system == "Linux":
+                chain = ChainBackend(LinuxFastBackend.probe(),
+                                     NmcliBackend() if capabilities().binary('nmcli') else None)
+            elif system == "Windows":
+                chain = ChainBackend(NetshBackend())
+            elif system == "Darwin":
+                chain = ChainBackend(AirportBackend())
+            else:
+                chain = ChainBackend()
+            _selected = chain
+        return _selected